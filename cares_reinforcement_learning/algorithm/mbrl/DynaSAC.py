@@ -83,7 +83,9 @@ class DynaSAC:
         # note that when evaluating this algorithm we need to select mu as
         self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            ).unsqueeze(0)
             if evaluation is False:
                 (action, _, _) = self.actor_net(state_tensor)
             else:
@@ -188,11 +190,11 @@ class DynaSAC:
         states, actions, rewards, next_states, dones, _ = experiences
 
         # Convert into tensor
-        states = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards = torch.FloatTensor(np.asarray(rewards)).to(self.device).unsqueeze(1)
-        next_states = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones = torch.LongTensor(np.asarray(dones)).to(self.device).unsqueeze(1)
+        states = hlp.to_tensor(states, self.device)
+        actions = hlp.to_tensor(actions, self.device)
+        rewards = hlp.to_tensor(rewards, self.device).unsqueeze(1)
+        next_states = hlp.to_tensor(next_states, self.device)
+        dones = hlp.to_tensor(dones, self.device, dtype=np.int64).unsqueeze(1)
 
         # Step 1 train as usual
         self._update_critic_actor(states, actions, rewards, next_states, dones)
@@ -217,14 +219,12 @@ class DynaSAC:
             _,
         ) = experiences
 
-        states = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards = torch.FloatTensor(np.asarray(rewards)).to(self.device).unsqueeze(1)
-        next_states = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        next_rewards = (
-            torch.FloatTensor(np.asarray(next_rewards)).to(self.device).unsqueeze(1)
-        )
-        next_actions = torch.FloatTensor(np.asarray(next_actions)).to(self.device)
+        states = hlp.to_tensor(states, self.device)
+        actions = hlp.to_tensor(actions, self.device)
+        rewards = hlp.to_tensor(rewards, self.device).unsqueeze(1)
+        next_states = hlp.to_tensor(next_states, self.device)
+        next_rewards = hlp.to_tensor(next_rewards, self.device).unsqueeze(1)
+        next_actions = hlp.to_tensor(next_actions, self.device)
 
         # Step 1 train the world model.
         self.world_model.train_world(
@@ -21,6 +21,48 @@ from cares_reinforcement_learning.networks.CTD4 import Actor, Critic
 from cares_reinforcement_learning.util.configurations import CTD4Config
 
 
+# The fusion methods take the critic outputs stacked along the ensemble dimension: [ensemble_size, batch_size, 1]
+# _kalman stays an eager loop over the ensemble to keep the per-step 1e-6 of the pairwise fusion;
+# only _average and _minimum are scripted so their elementwise chains compile into fused kernels.
+def _kalman(
+    u_stack: torch.Tensor, std_stack: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor]:
+    # Kalman fusion - sequentially fuses each critic into the running estimate.
+    # The loop runs over the (small) ensemble dimension only; each step is elementwise over the batch.
+    fusion_u = u_stack[0]
+    fusion_variance = std_stack[0].pow(2)
+    for i in range(1, u_stack.shape[0]):
+        variance = std_stack[i].pow(2)
+        kalman_gain = fusion_variance / (fusion_variance + variance)
+        fusion_u = fusion_u + kalman_gain * (u_stack[i] - fusion_u)
+        # 1e-6 was included to avoid values equal to 0
+        fusion_variance = (
+            (1 - kalman_gain) * fusion_variance + kalman_gain * variance + 1e-6
+        )
+    fusion_std = torch.sqrt(fusion_variance)
+    return fusion_u, fusion_std
+
+
+@torch.jit.script
+def _average(
+    u_stack: torch.Tensor, std_stack: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor]:
+    # Average value among the critic predictions:
+    fusion_u = u_stack.mean(dim=0)
+    fusion_std = std_stack.mean(dim=0)
+    return fusion_u, fusion_std
+
+
+@torch.jit.script
+def _minimum(
+    u_stack: torch.Tensor, std_stack: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor]:
+    fusion_u, min_indices = torch.min(u_stack, dim=0, keepdim=True)
+    # This corresponds to the std of the min U index. That is; the min cannot be got between the stds
+    fusion_std = std_stack.gather(0, min_indices)
+    return fusion_u.squeeze(0), fusion_std.squeeze(0)
+
+
 class CTD4:
     def __init__(
         self,
@@ -54,6 +96,8 @@ class CTD4:
 
         self.fusion_method = config.fusion_method
 
+        self.mixed_precision = config.mixed_precision
+
         self.learn_counter = 0
         self.policy_update_freq = config.policy_update_freq
 
@@ -70,15 +114,21 @@ class CTD4:
             for critic_net in self.ensemble_critic.critics
         ]
 
+        # Stacked (detached) critic weights for the vectorised ensemble forward, keyed by id of the ensemble.
+        # Entries are dropped whenever that ensemble's weights change and re-stacked on the next forward.
+        self._stacked_critic_states: dict[int, tuple[dict, dict]] = {}
+
     def select_action_from_policy(
         self, state: np.ndarray, evaluation: bool = False, noise_scale: float = 0.1
     ) -> np.ndarray:
         self.actor_net.eval()
-        with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
-            state_tensor = state_tensor.unsqueeze(0)
+        # inference_mode skips the autograd version tracking that no_grad still performs
+        with torch.inference_mode():
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            ).unsqueeze(0)
             action = self.actor_net(state_tensor)
-            action = action.cpu().data.numpy().flatten()
+            action = action.flatten().cpu().numpy()
             if not evaluation:
                 noise = np.random.normal(0, scale=noise_scale, size=self.action_num)
                 action = action + noise
@@ -86,68 +136,31 @@ class CTD4:
         self.actor_net.train()
         return action
 
-    def _fusion_kalman(
-        self,
-        std_1: torch.Tensor,
-        mean_1: torch.Tensor,
-        std_2: torch.Tensor,
-        mean_2: torch.Tensor,
-    ) -> tuple[torch.Tensor, torch.Tensor]:
-        kalman_gain = (std_1**2) / (std_1**2 + std_2**2)
-        fusion_mean = mean_1 + kalman_gain * (mean_2 - mean_1)
-        fusion_variance = (
-            (1 - kalman_gain) * std_1**2 + kalman_gain * std_2**2 + 1e-6
-        )  # 1e-6 was included to avoid values equal to 0
-        fusion_std = torch.sqrt(fusion_variance)
-        return fusion_mean, fusion_std
-
-    def _kalman(
-        self, u_set: list[torch.Tensor], std_set: list[torch.Tensor]
-    ) -> tuple[torch.Tensor, torch.Tensor]:
-        # Kalman fusion
-        for i in range(len(u_set) - 1):
-            if i == 0:
-                x_1, std_1 = u_set[i], std_set[i]
-                x_2, std_2 = u_set[i + 1], std_set[i + 1]
-                fusion_u, fusion_std = self._fusion_kalman(std_1, x_1, std_2, x_2)
-            else:
-                x_2, std_2 = u_set[i + 1], std_set[i + 1]
-                fusion_u, fusion_std = self._fusion_kalman(
-                    fusion_std, fusion_u, std_2, x_2
-                )
-        return fusion_u, fusion_std
-
-    def _average(
-        self, u_set: list[torch.Tensor], std_set: list[torch.Tensor], batch_size: int
+    def _ensemble_forward(
+        self, ensemble_critic: Critic, states: torch.Tensor, actions: torch.Tensor
     ) -> tuple[torch.Tensor, torch.Tensor]:
-        # Average value among the critic predictions:
-        fusion_u = (
-            torch.mean(torch.concat(u_set, dim=1), dim=1)
-            .unsqueeze(0)
-            .reshape(batch_size, 1)
-        )
-        fusion_std = (
-            torch.mean(torch.concat(std_set, dim=1), dim=1)
-            .unsqueeze(0)
-            .reshape(batch_size, 1)
-        )
-        return fusion_u, fusion_std
+        # Stack the critic weights along an ensemble dimension and run all critics in a single vectorised pass.
+        # The stacked weights are detached - callers only need gradients w.r.t. the states/actions, if any.
+        key = id(ensemble_critic)
+        if key not in self._stacked_critic_states:
+            params, buffers = torch.func.stack_module_state(ensemble_critic.critics)
+            self._stacked_critic_states[key] = (
+                {name: param.detach() for name, param in params.items()},
+                buffers,
+            )
+        params, buffers = self._stacked_critic_states[key]
+        base_critic = ensemble_critic.critics[0]
 
-    def _minimum(
-        self, u_set: list[torch.Tensor], std_set: list[torch.Tensor], batch_size: int
-    ) -> tuple[torch.Tensor, torch.Tensor]:
-        fusion_min = torch.min(torch.concat(u_set, dim=1), dim=1)
-        fusion_u = fusion_min.values.unsqueeze(0).reshape(batch_size, 1)
-        # # This corresponds to the std of the min U index. That is; the min cannot be got between the stds
-        std_concat = torch.concat(std_set, dim=1)
-        fusion_std = (
-            torch.stack(
-                [std_concat[i, fusion_min.indices[i]] for i in range(len(std_concat))]
+        def critic_forward(params, buffers, states, actions):
+            return torch.func.functional_call(
+                base_critic, (params, buffers), (states, actions)
             )
-            .unsqueeze(0)
-            .reshape(batch_size, 1)
+
+        # u and std are both [ensemble_size, batch_size, 1]
+        u_stack, std_stack = torch.vmap(critic_forward, in_dims=(0, 0, None, None))(
+            params, buffers, states, actions
         )
-        return fusion_u, fusion_std
+        return u_stack, std_stack
 
     def _update_critics(
         self,
@@ -157,8 +170,6 @@ class CTD4:
         next_states: torch.Tensor,
         dones: torch.Tensor,
     ) -> list[float]:
-        batch_size = len(states)
-
         with torch.no_grad():
             next_actions = self.target_actor_net(next_states)
 
@@ -169,21 +180,16 @@ class CTD4:
             next_actions = next_actions + target_noise
             next_actions = torch.clamp(next_actions, min=-1, max=1)
 
-            u_set = []
-            std_set = []
-
-            for target_critic_net in self.target_ensemble_critic.critics:
-                u, std = target_critic_net(next_states, next_actions)
-
-                u_set.append(u)
-                std_set.append(std)
+            u_stack, std_stack = self._ensemble_forward(
+                self.target_ensemble_critic, next_states, next_actions
+            )
 
             if self.fusion_method == "kalman":
-                fusion_u, fusion_std = self._kalman(u_set, std_set)
+                fusion_u, fusion_std = _kalman(u_stack, std_stack)
             elif self.fusion_method == "average":
-                fusion_u, fusion_std = self._average(u_set, std_set, batch_size)
+                fusion_u, fusion_std = _average(u_stack, std_stack)
             elif self.fusion_method == "minimum":
-                fusion_u, fusion_std = self._minimum(u_set, std_set, batch_size)
+                fusion_u, fusion_std = _minimum(u_stack, std_stack)
             else:
                 raise ValueError(
                     f"Invalid fusion method: {self.fusion_method}. Please choose between 'kalman', 'average', or 'minimum'."
@@ -192,58 +198,56 @@ class CTD4:
             # Create the target distribution = aX+b
             u_target = rewards + self.gamma * fusion_u * (1 - dones)
             std_target = self.gamma * fusion_std
-            target_distribution = torch.distributions.normal.Normal(
-                u_target, std_target
-            )
 
-        critic_loss_totals = []
+        critic_losses = []
 
-        for critic_net, critic_net_optimiser in zip(
-            self.ensemble_critic.critics, self.ensemble_critic_optimizers
-        ):
-            u_current, std_current = critic_net(states, actions)
-            current_distribution = torch.distributions.normal.Normal(
-                u_current, std_current
-            )
+        for critic_net in self.ensemble_critic.critics:
+            # Only the critic forward is autocast - the KL loss is kept in float32 for small stds
+            with torch.autocast(
+                device_type=self.device.type,
+                dtype=torch.bfloat16,
+                enabled=self.mixed_precision,
+            ):
+                u_current, std_current = critic_net(states, actions)
+            u_current, std_current = u_current.float(), std_current.float()
 
-            # Compute each critic loss
-            critic_individual_loss = torch.distributions.kl.kl_divergence(
-                current_distribution, target_distribution
+            # Compute each critic loss - KL(current || target) between the two normal distributions
+            critic_individual_loss = hlp.kl_normal(
+                u_current, std_current, u_target, std_target
             ).mean()
+            critic_losses.append(critic_individual_loss)
+
+        critic_losses_tensor = torch.stack(critic_losses)
 
+        # Each loss only depends on its own critic, so a single backward pass over the sum
+        # gives every critic exactly its own gradients
+        for critic_net_optimiser in self.ensemble_critic_optimizers:
             critic_net_optimiser.zero_grad()
-            critic_individual_loss.backward()
+        critic_losses_tensor.sum().backward()
+        for critic_net_optimiser in self.ensemble_critic_optimizers:
             critic_net_optimiser.step()
+        self._stacked_critic_states.pop(id(self.ensemble_critic), None)
 
-            critic_loss_totals.append(critic_individual_loss.item())
-
-        return critic_loss_totals
+        return critic_losses_tensor.tolist()
 
     def _update_actor(self, states: torch.Tensor) -> float:
-        batch_size = len(states)
-
-        actor_q_u_set = []
-        actor_q_std_set = []
-
         actions = self.actor_net(states)
         with hlp.evaluating(self.ensemble_critic):
-            for critic_net in self.ensemble_critic.critics:
-                actor_q_u, actor_q_std = critic_net(states, actions)
-
-                actor_q_u_set.append(actor_q_u)
-                actor_q_std_set.append(actor_q_std)
+            actor_q_u_stack, actor_q_std_stack = self._ensemble_forward(
+                self.ensemble_critic, states, actions
+            )
 
         if self.fusion_method == "kalman":
             # Kalman filter combination of all critics and then a single mean for the actor loss
-            fusion_u_a, _ = self._kalman(actor_q_u_set, actor_q_std_set)
+            fusion_u_a, _ = _kalman(actor_q_u_stack, actor_q_std_stack)
 
         elif self.fusion_method == "average":
             # Average combination of all critics and then a single mean for the actor loss
-            fusion_u_a, _ = self._average(actor_q_u_set, actor_q_std_set, batch_size)
+            fusion_u_a, _ = _average(actor_q_u_stack, actor_q_std_stack)
 
         elif self.fusion_method == "minimum":
             # Minimum all critics and then a single mean for the actor loss
-            fusion_u_a, _ = self._minimum(actor_q_u_set, actor_q_std_set, batch_size)
+            fusion_u_a, _ = _minimum(actor_q_u_stack, actor_q_std_stack)
 
         else:
             raise ValueError(
@@ -269,18 +273,16 @@ class CTD4:
         experiences = memory.sample_uniform(batch_size)
         states, actions, rewards, next_states, dones, _ = experiences
 
-        batch_size = len(states)
-
         # Convert into tensor
-        states = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states = hlp.to_tensor(states, self.device)
+        actions = hlp.to_tensor(actions, self.device)
+        rewards = hlp.to_tensor(rewards, self.device)
+        next_states = hlp.to_tensor(next_states, self.device)
+        dones = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size
-        rewards = rewards.unsqueeze(0).reshape(batch_size, 1)
-        dones = dones.unsqueeze(0).reshape(batch_size, 1)
+        rewards = rewards.view(-1, 1)
+        dones = dones.view(-1, 1)
 
         info: dict[str, Any] = {}
 
@@ -295,11 +297,11 @@ class CTD4:
             actor_loss = self._update_actor(states)
             info["actor_loss"] = actor_loss
 
-            # Update ensemble of target critics
-            for critic_net, target_critic_net in zip(
-                self.ensemble_critic.critics, self.target_ensemble_critic.critics
-            ):
-                hlp.soft_update_params(critic_net, target_critic_net, self.tau)
+            # Update ensemble of target critics - all critics are blended in a single call
+            hlp.soft_update_params(
+                self.ensemble_critic, self.target_ensemble_critic, self.tau
+            )
+            self._stacked_critic_states.pop(id(self.target_ensemble_critic), None)
 
             # Update target actor
             hlp.soft_update_params(self.actor_net, self.target_actor_net, self.tau)
@@ -320,6 +322,12 @@ class CTD4:
         actor_path = f"{filepath}/{filename}_actor.pht"
         ensemble_path = f"{filepath}/{filename}_ensemble.pht"
 
-        self.actor_net.load_state_dict(torch.load(actor_path))
-        self.ensemble_critic.load_state_dict(torch.load(ensemble_path))
+        # Load the weights straight onto the device and skip unpickling arbitrary objects
+        self.actor_net.load_state_dict(
+            torch.load(actor_path, map_location=self.device, weights_only=True)
+        )
+        self.ensemble_critic.load_state_dict(
+            torch.load(ensemble_path, map_location=self.device, weights_only=True)
+        )
+        self._stacked_critic_states.clear()
         logging.info("models have been loaded successfully.")
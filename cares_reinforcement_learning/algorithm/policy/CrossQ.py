@@ -67,7 +67,9 @@ class CrossQ:
         # note that when evaluating this algorithm we need to select mu as action
         self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            )
             state_tensor = state_tensor.unsqueeze(0)
             if evaluation:
                 (_, _, action) = self.actor_net(state_tensor)
@@ -155,11 +157,11 @@ class CrossQ:
         batch_size = len(states)
 
         # Convert into tensor
-        states = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states = hlp.to_tensor(states, self.device)
+        actions = hlp.to_tensor(actions, self.device)
+        rewards = hlp.to_tensor(rewards, self.device)
+        next_states = hlp.to_tensor(next_states, self.device)
+        dones = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size x whatever
         rewards = rewards.unsqueeze(0).reshape(batch_size, 1)
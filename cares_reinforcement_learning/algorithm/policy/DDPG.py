@@ -54,7 +54,9 @@ class DDPG:
 
         self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            )
             state_tensor = state_tensor.unsqueeze(0)
             action = self.actor_net(state_tensor)
             action = action.cpu().data.numpy().flatten()
@@ -106,11 +108,11 @@ class DDPG:
         batch_size = len(states)
 
         # Convert into tensor
-        states_tensors = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensors = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensors = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensors = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensors = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states_tensors = hlp.to_tensor(states, self.device)
+        actions_tensors = hlp.to_tensor(actions, self.device)
+        rewards_tensors = hlp.to_tensor(rewards, self.device)
+        next_states_tensors = hlp.to_tensor(next_states, self.device)
+        dones_tensors = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size x whatever
         rewards_tensors = rewards_tensors.unsqueeze(0).reshape(batch_size, 1)
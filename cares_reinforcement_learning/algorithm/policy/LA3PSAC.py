@@ -46,6 +46,8 @@ class LA3PSAC:
         self.learn_counter = 0
         self.target_update_freq = config.target_update_freq
 
+        self.mixed_precision = config.mixed_precision
+
         self.target_entropy = -self.actor_net.num_actions
 
         self.actor_net_optimiser = torch.optim.Adam(
@@ -68,14 +70,16 @@ class LA3PSAC:
 
         # note that when evaluating this algorithm we need to select mu as action
         self.actor_net.eval()
-        with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
-            state_tensor = state_tensor.unsqueeze(0)
+        # inference_mode skips the autograd version tracking that no_grad still performs
+        with torch.inference_mode():
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            ).unsqueeze(0)
             if evaluation:
-                (_, _, action) = self.actor_net(state_tensor)
+                _, _, action = self.actor_net(state_tensor)
             else:
-                (action, _, _) = self.actor_net(state_tensor)
-            action = action.cpu().data.numpy().flatten()
+                action, _, _ = self.actor_net(state_tensor)
+            action = action.flatten().cpu().numpy()
         self.actor_net.train()
         return action
 
@@ -83,26 +87,42 @@ class LA3PSAC:
     def alpha(self) -> torch.Tensor:
         return self.log_alpha.exp()
 
-    def _update_critic(
+    def _experiences_to_tensors(
         self,
-        states: np.ndarray,
-        actions: np.ndarray,
-        rewards: np.ndarray,
-        next_states: np.ndarray,
-        dones: np.ndarray,
-        uniform_sampling: bool,
-    ) -> tuple[float, np.ndarray]:
-
+        states: list[np.ndarray],
+        actions: list[np.ndarray],
+        rewards: list[float],
+        next_states: list[np.ndarray],
+        dones: list[bool],
+    ) -> tuple[torch.Tensor, ...]:
         # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensor = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states_tensor = hlp.to_tensor(states, self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
+        next_states_tensor = hlp.to_tensor(next_states, self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size
-        rewards_tensor = rewards_tensor.unsqueeze(0).reshape(len(rewards_tensor), 1)
-        dones_tensor = dones_tensor.unsqueeze(0).reshape(len(dones_tensor), 1)
+        rewards_tensor = rewards_tensor.view(-1, 1)
+        dones_tensor = dones_tensor.view(-1, 1)
+
+        return (
+            states_tensor,
+            actions_tensor,
+            rewards_tensor,
+            next_states_tensor,
+            dones_tensor,
+        )
+
+    def _update_critic(
+        self,
+        states_tensor: torch.Tensor,
+        actions_tensor: torch.Tensor,
+        rewards_tensor: torch.Tensor,
+        next_states_tensor: torch.Tensor,
+        dones_tensor: torch.Tensor,
+        uniform_sampling: bool,
+    ) -> tuple[float, np.ndarray]:
 
         with torch.no_grad():
             with hlp.evaluating(self.actor_net):
@@ -122,50 +142,36 @@ class LA3PSAC:
                 + self.gamma * (1 - dones_tensor) * target_q_values
             )
 
-        q_values_one, q_values_two = self.critic_net(states_tensor, actions_tensor)
+        # Only the critic forward is autocast - the TD errors and priorities are kept in float32
+        with torch.autocast(
+            device_type=self.device.type,
+            dtype=torch.bfloat16,
+            enabled=self.mixed_precision,
+        ):
+            q_values_one, q_values_two = self.critic_net(states_tensor, actions_tensor)
+        q_values_one, q_values_two = q_values_one.float(), q_values_two.float()
 
         td_error_one = (q_values_one - q_target).abs()
         td_error_two = (q_values_two - q_target).abs()
 
-        if uniform_sampling:
-            pal_loss_one = hlp.prioritized_approximate_loss(
-                td_error_one, self.min_priority, self.per_alpha
-            )
-            pal_loss_two = hlp.prioritized_approximate_loss(
-                td_error_two, self.min_priority, self.per_alpha
-            )
-            critic_loss_total = pal_loss_one + pal_loss_two
-            critic_loss_total /= (
-                torch.max(td_error_one, td_error_two)
-                .clamp(min=self.min_priority)
-                .pow(self.per_alpha)
-                .mean()
-                .detach()
-            )
-        else:
-            huber_lose_one = hlp.huber(td_error_one, self.min_priority)
-            huber_lose_two = hlp.huber(td_error_two, self.min_priority)
-            critic_loss_total = huber_lose_one + huber_lose_two
+        critic_loss_total, priorities = hlp.la3p_critic_loss(
+            td_error_one,
+            td_error_two,
+            self.min_priority,
+            self.per_alpha,
+            uniform_sampling,
+        )
 
         # Update the Critic
         self.critic_net_optimiser.zero_grad()
         critic_loss_total.backward()
         self.critic_net_optimiser.step()
 
-        priorities = (
-            torch.max(td_error_one, td_error_two)
-            .clamp(min=self.min_priority)
-            .pow(self.per_alpha)
-            .cpu()
-            .data.numpy()
-            .flatten()
-        )
+        return critic_loss_total.item(), priorities.cpu().numpy().flatten()
 
-        return critic_loss_total.item(), priorities
-
-    def _update_actor_alpha(self, states: np.ndarray) -> tuple[float, float]:
-        # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
+    def _update_actor_alpha(self, states_tensor: torch.Tensor) -> tuple[float, float]:
+        # The temperature is a constant for the actor update
+        alpha = self.alpha.detach()
 
         # Update Actor
         actions, next_log_pi, _ = self.actor_net(states_tensor)
@@ -175,19 +181,18 @@ class LA3PSAC:
         )
 
         min_q_values = torch.minimum(target_q_values_one, target_q_values_two)
-        actor_loss = ((self.alpha * next_log_pi) - min_q_values).mean()
+        actor_loss = ((alpha * next_log_pi) - min_q_values).mean()
 
         # Update the Actor
         self.actor_net_optimiser.zero_grad()
         actor_loss.backward()
         self.actor_net_optimiser.step()
 
-        # update the temperature
-        alpha_loss = -(
-            self.log_alpha * (next_log_pi + self.target_entropy).detach()
-        ).mean()
-        self.log_alpha_optimizer.zero_grad()
-        alpha_loss.backward()
+        # update the temperature - log_alpha is a scalar so the gradient of
+        # -(log_alpha * (log_pi + target_entropy)).mean() is set directly instead of through autograd
+        entropy_error = (next_log_pi.detach() + self.target_entropy).mean()
+        alpha_loss = -self.log_alpha.detach() * entropy_error
+        self.log_alpha.grad = -entropy_error.to(self.log_alpha.dtype)
         self.log_alpha_optimizer.step()
 
         return actor_loss.item(), alpha_loss.item()
@@ -204,6 +209,11 @@ class LA3PSAC:
         experiences = memory.sample_uniform(uniform_batch_size)
         states, actions, rewards, next_states, dones, indices = experiences
 
+        # Converted once and shared between the critic and actor updates
+        states, actions, rewards, next_states, dones = self._experiences_to_tensors(
+            states, actions, rewards, next_states, dones
+        )
+
         info_uniform = {}
 
         critic_loss_total, priorities = self._update_critic(
@@ -231,6 +241,10 @@ class LA3PSAC:
         experiences = memory.sample_priority(priority_batch_size, sampling="simple")
         states, actions, rewards, next_states, dones, indices, _ = experiences
 
+        states, actions, rewards, next_states, dones = self._experiences_to_tensors(
+            states, actions, rewards, next_states, dones
+        )
+
         info_priority = {}
 
         critic_loss_total, priorities = self._update_critic(
@@ -252,6 +266,9 @@ class LA3PSAC:
         experiences = memory.sample_inverse_priority(priority_batch_size)
         states, actions, rewards, next_states, dones, indices, _ = experiences
 
+        # Only the states are needed for the actor update
+        states = hlp.to_tensor(states, self.device)
+
         actor_loss, alpha_loss = self._update_actor_alpha(states)
         info_priority["actor_loss"] = actor_loss
         info_priority["alpha_loss"] = alpha_loss
@@ -269,6 +286,14 @@ class LA3PSAC:
         logging.info("models has been saved...")
 
     def load_models(self, filepath: str, filename: str) -> None:
-        self.actor_net.load_state_dict(torch.load(f"{filepath}/{filename}_actor.pht"))
-        self.critic_net.load_state_dict(torch.load(f"{filepath}/{filename}_critic.pht"))
+        actor_path = f"{filepath}/{filename}_actor.pht"
+        critic_path = f"{filepath}/{filename}_critic.pht"
+
+        # Load the weights straight onto the device and skip unpickling arbitrary objects
+        self.actor_net.load_state_dict(
+            torch.load(actor_path, map_location=self.device, weights_only=True)
+        )
+        self.critic_net.load_state_dict(
+            torch.load(critic_path, map_location=self.device, weights_only=True)
+        )
         logging.info("models has been loaded...")
@@ -38,6 +38,20 @@ class LA3PTD3:
         self.target_critic_net = copy.deepcopy(self.critic_net)
         self.target_critic_net.eval()  # never in training mode - helps with batch/drop out layers
 
+        # Compiled after the targets are copied so each network gets its own compiled forward
+        if config.use_compile:
+            for network in (
+                self.actor_net,
+                self.critic_net,
+                self.target_actor_net,
+                self.target_critic_net,
+            ):
+                hlp.compile_network(network)
+
+        # Gradients are averaged across workers when launched with torch.distributed
+        self.actor_net = hlp.wrap_distributed(self.actor_net, self.device)
+        self.critic_net = hlp.wrap_distributed(self.critic_net, self.device)
+
         self.gamma = config.gamma
         self.tau = config.tau
 
@@ -51,7 +65,10 @@ class LA3PTD3:
         self.learn_counter = 0
         self.policy_update_freq = config.policy_update_freq
 
-        self.action_num = self.actor_net.num_actions
+        self.action_num = actor_network.num_actions
+
+        # Only toggle eval/train around action selection when the actor has layers that depend on the mode
+        self.actor_has_mode_layers = hlp.has_mode_dependent_layers(self.actor_net)
 
         self.actor_net_optimiser = torch.optim.Adam(
             self.actor_net.parameters(), lr=config.actor_lr
@@ -63,18 +80,21 @@ class LA3PTD3:
     def select_action_from_policy(
         self, state: np.ndarray, evaluation: bool = False, noise_scale: float = 0.1
     ) -> np.ndarray:
-        self.actor_net.eval()
+        if self.actor_has_mode_layers:
+            self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
-            state_tensor = state_tensor.unsqueeze(0)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            ).unsqueeze(0)
             action = self.actor_net(state_tensor)
-            action = action.cpu().data.numpy().flatten()
+            action = action.flatten().cpu().numpy()
             if not evaluation:
                 # this is part the TD3 too, add noise to the action
                 noise = np.random.normal(0, scale=noise_scale, size=self.action_num)
                 action = action + noise
                 action = np.clip(action, -1, 1)
-        self.actor_net.train()
+        if self.actor_has_mode_layers:
+            self.actor_net.train()
         return action
 
     def _update_target_network(self) -> None:
@@ -82,26 +102,42 @@ class LA3PTD3:
         hlp.soft_update_params(self.critic_net, self.target_critic_net, self.tau)
         hlp.soft_update_params(self.actor_net, self.target_actor_net, self.tau)
 
-    def _update_critic(
+    def _experiences_to_tensors(
         self,
         states: np.ndarray,
         actions: np.ndarray,
         rewards: np.ndarray,
         next_states: np.ndarray,
         dones: np.ndarray,
-        uniform_sampling: bool,
-    ) -> tuple[float, np.ndarray]:
+    ) -> tuple[torch.Tensor, ...]:
         # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensor = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states_tensor = hlp.to_tensor(states, self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
+        next_states_tensor = hlp.to_tensor(next_states, self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.bool_)
 
         # Reshape to batch_size
-        rewards_tensor = rewards_tensor.unsqueeze(0).reshape(len(rewards_tensor), 1)
-        dones_tensor = dones_tensor.unsqueeze(0).reshape(len(dones_tensor), 1)
+        rewards_tensor = rewards_tensor.view(-1, 1)
+        dones_tensor = dones_tensor.view(-1, 1)
+
+        return (
+            states_tensor,
+            actions_tensor,
+            rewards_tensor,
+            next_states_tensor,
+            dones_tensor,
+        )
 
+    def _update_critic(
+        self,
+        states_tensor: torch.Tensor,
+        actions_tensor: torch.Tensor,
+        rewards_tensor: torch.Tensor,
+        next_states_tensor: torch.Tensor,
+        dones_tensor: torch.Tensor,
+        uniform_sampling: bool,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
         with torch.no_grad():
             next_actions = self.target_actor_net(next_states_tensor)
 
@@ -116,8 +152,11 @@ class LA3PTD3:
 
             target_q_values = torch.minimum(target_q_values_one, target_q_values_two)
 
+            # Terminal transitions have no bootstrapped value - masked in a single pass
             q_target = (
-                rewards_tensor + self.gamma * (1 - dones_tensor) * target_q_values
+                target_q_values.masked_fill(dones_tensor, 0.0)
+                .mul_(self.gamma)
+                .add_(rewards_tensor)
             )
 
         q_values_one, q_values_two = self.critic_net(states_tensor, actions_tensor)
@@ -125,51 +164,29 @@ class LA3PTD3:
         td_error_one = (q_values_one - q_target).abs()
         td_error_two = (q_values_two - q_target).abs()
 
-        if uniform_sampling:
-            pal_loss_one = hlp.prioritized_approximate_loss(
-                td_error_one, self.min_priority, self.per_alpha
-            )
-            pal_loss_two = hlp.prioritized_approximate_loss(
-                td_error_two, self.min_priority, self.per_alpha
-            )
-            critic_loss_total = pal_loss_one + pal_loss_two
-
-            critic_loss_total /= (
-                torch.max(td_error_one, td_error_two)
-                .clamp(min=self.min_priority)
-                .pow(self.per_alpha)
-                .mean()
-                .detach()
-            )
-        else:
-            huber_lose_one = hlp.huber(td_error_one, self.min_priority)
-            huber_lose_two = hlp.huber(td_error_two, self.min_priority)
-            critic_loss_total = huber_lose_one + huber_lose_two
+        critic_loss_total, priorities = hlp.la3p_critic_loss(
+            td_error_one,
+            td_error_two,
+            self.min_priority,
+            self.per_alpha,
+            uniform_sampling,
+        )
 
         # Update the Critic
         self.critic_net_optimiser.zero_grad()
         critic_loss_total.backward()
         self.critic_net_optimiser.step()
 
-        priorities = (
-            torch.max(td_error_one, td_error_two)
-            .clamp(self.min_priority)
-            .pow(self.per_alpha)
-            .cpu()
-            .data.numpy()
-            .flatten()
-        )
-
-        return critic_loss_total.item(), priorities
-
-    def _update_actor(self, states: np.ndarray) -> float:
-        # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
+        # Returned on the device - the caller reads them back once the remaining updates are queued
+        return critic_loss_total.detach(), priorities
 
+    def _update_actor(self, states_tensor: torch.Tensor) -> float:
         # Update Actor
         actions = self.actor_net(states_tensor)
-        with hlp.evaluating(self.critic_net):
-            actor_q_values, _ = self.critic_net(states_tensor, actions)
+        # The critic gradients from the actor loss are discarded, so they are not synced across workers
+        critic_net = hlp.unwrap_network(self.critic_net)
+        with hlp.evaluating(critic_net):
+            actor_q_values, _ = critic_net(states_tensor, actions)
 
         actor_loss = -actor_q_values.mean()
 
@@ -191,6 +208,11 @@ class LA3PTD3:
         experiences = memory.sample_uniform(uniform_batch_size)
         states, actions, rewards, next_states, dones, indices = experiences
 
+        # Converted once and shared between the critic and actor updates
+        states, actions, rewards, next_states, dones = self._experiences_to_tensors(
+            states, actions, rewards, next_states, dones
+        )
+
         info_uniform = {}
 
         critic_loss_total, priorities = self._update_critic(
@@ -201,9 +223,6 @@ class LA3PTD3:
             dones,
             uniform_sampling=True,
         )
-        info_uniform["critic_loss_total"] = critic_loss_total
-
-        memory.update_priorities(indices, priorities)
 
         if policy_update:
             actor_loss = self._update_actor(states)
@@ -211,10 +230,17 @@ class LA3PTD3:
 
             self._update_target_network()
 
+        info_uniform["critic_loss_total"] = critic_loss_total.item()
+        memory.update_priorities(indices, priorities.cpu().numpy().flatten())
+
         ######################### CRITIC PRIORITIZED SAMPLING #########################
         experiences = memory.sample_priority(priority_batch_size, sampling="simple")
         states, actions, rewards, next_states, dones, indices, _ = experiences
 
+        states, actions, rewards, next_states, dones = self._experiences_to_tensors(
+            states, actions, rewards, next_states, dones
+        )
+
         info_priority = {}
 
         critic_loss_total, priorities = self._update_critic(
@@ -225,15 +251,18 @@ class LA3PTD3:
             dones,
             uniform_sampling=False,
         )
-        info_priority["critic_loss_total"] = critic_loss_total
+        info_priority["critic_loss_total"] = critic_loss_total.item()
 
-        memory.update_priorities(indices, priorities)
+        memory.update_priorities(indices, priorities.cpu().numpy().flatten())
 
         ######################### ACTOR PRIORITIZED SAMPLING #########################
         if policy_update:
             experiences = memory.sample_inverse_priority(priority_batch_size)
             states, actions, rewards, next_states, dones, indices, _ = experiences
 
+            # Only the states are needed for the actor update
+            states = hlp.to_tensor(states, self.device)
+
             actor_loss = self._update_actor(states)
             info_priority["actor_loss"] = actor_loss
 
@@ -243,14 +272,28 @@ class LA3PTD3:
         return info
 
     def save_models(self, filepath: str, filename: str) -> None:
+        # Every worker holds the same weights, so only the main process writes them
+        if not hlp.is_main_process():
+            return
+
         if not os.path.exists(filepath):
             os.makedirs(filepath)
 
-        torch.save(self.actor_net.state_dict(), f"{filepath}/{filename}_actor.pht")
-        torch.save(self.critic_net.state_dict(), f"{filepath}/{filename}_critic.pht")
+        actor_net = hlp.unwrap_network(self.actor_net)
+        critic_net = hlp.unwrap_network(self.critic_net)
+        torch.save(actor_net.state_dict(), f"{filepath}/{filename}_actor.pht")
+        torch.save(critic_net.state_dict(), f"{filepath}/{filename}_critic.pht")
         logging.info("models has been saved...")
 
     def load_models(self, filepath: str, filename: str) -> None:
-        self.actor_net.load_state_dict(torch.load(f"{filepath}/{filename}_actor.pht"))
-        self.critic_net.load_state_dict(torch.load(f"{filepath}/{filename}_critic.pht"))
+        actor_path = f"{filepath}/{filename}_actor.pht"
+        critic_path = f"{filepath}/{filename}_critic.pht"
+
+        # Load the weights straight onto the device and skip unpickling arbitrary objects
+        hlp.unwrap_network(self.actor_net).load_state_dict(
+            torch.load(actor_path, map_location=self.device, weights_only=True)
+        )
+        hlp.unwrap_network(self.critic_net).load_state_dict(
+            torch.load(critic_path, map_location=self.device, weights_only=True)
+        )
         logging.info("models has been loaded...")
@@ -62,7 +62,9 @@ class LAPTD3:
     ) -> np.ndarray:
         self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            )
             state_tensor = state_tensor.unsqueeze(0)
             action = self.actor_net(state_tensor)
             action = action.cpu().data.numpy().flatten()
@@ -148,11 +150,11 @@ class LAPTD3:
         batch_size = len(states)
 
         # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensor = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states_tensor = hlp.to_tensor(states, self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
+        next_states_tensor = hlp.to_tensor(next_states, self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size
         rewards_tensor = rewards_tensor.unsqueeze(0).reshape(batch_size, 1)
@@ -232,12 +232,12 @@ class NaSATD3:
 
         states_tensor = hlp.image_states_dict_to_tensor(states, self.device)
 
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
 
         next_states_tensor = hlp.image_states_dict_to_tensor(next_states, self.device)
 
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size
         rewards_tensor = rewards_tensor.unsqueeze(0).reshape(batch_size, 1)
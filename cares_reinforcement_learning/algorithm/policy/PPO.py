@@ -17,6 +17,7 @@ import torch
 import torch.nn.functional as F
 from torch.distributions import MultivariateNormal
 
+import cares_reinforcement_learning.util.helpers as hlp
 from cares_reinforcement_learning.memory import MemoryBuffer
 from cares_reinforcement_learning.networks.PPO import Actor, Critic
 from cares_reinforcement_learning.util.configurations import PPOConfig
@@ -57,7 +58,9 @@ class PPO:
     ) -> tuple[np.ndarray, np.ndarray]:
         self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            )
             state_tensor = state_tensor.unsqueeze(0)
 
             mean = self.actor_net(state_tensor)
@@ -84,33 +87,36 @@ class PPO:
         return v, log_prob
 
     def _calculate_rewards_to_go(
-        self, batch_rewards: torch.Tensor, batch_dones: torch.Tensor
+        self, batch_rewards: np.ndarray, batch_dones: np.ndarray
     ) -> torch.Tensor:
-        rtgs: list[float] = []
-        discounted_reward = 0
-        for reward, done in zip(reversed(batch_rewards), reversed(batch_dones)):
-            discounted_reward = reward + self.gamma * (1 - done) * discounted_reward
-            rtgs.insert(0, discounted_reward)
-        batch_rtgs = torch.tensor(rtgs, dtype=torch.float).to(self.device)  # shape 5000
+        # Accumulated on the host into a preallocated array indexed by t, then uploaded once
+        rtgs = np.empty(len(batch_rewards), dtype=np.float32)
+        discounted_reward = 0.0
+        for t in reversed(range(len(batch_rewards))):
+            discounted_reward = (
+                batch_rewards[t] + self.gamma * (1 - batch_dones[t]) * discounted_reward
+            )
+            rtgs[t] = discounted_reward
+        batch_rtgs = hlp.to_tensor(rtgs, self.device)  # shape 5000
         return batch_rtgs
 
     def train_policy(self, memory: MemoryBuffer, batch_size: int = 0) -> dict[str, Any]:
         # pylint: disable-next=unused-argument
 
         experiences = memory.flush()
-        states, actions, rewards, next_states, dones, log_probs = experiences
+        states, actions, rewards, _, dones, log_probs = experiences
 
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensor = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
-        log_probs_tensor = torch.FloatTensor(np.asarray(log_probs)).to(self.device)
+        # Pinned, non-blocking uploads - the copies overlap with the host rewards-to-go loop below
+        states_tensor = hlp.to_tensor(states, self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        log_probs_tensor = hlp.to_tensor(log_probs, self.device)
 
         log_probs_tensor = log_probs_tensor.squeeze()
 
         # compute reward to go:
-        rtgs = self._calculate_rewards_to_go(rewards_tensor, dones_tensor)
+        rtgs = self._calculate_rewards_to_go(
+            np.asarray(rewards, dtype=np.float32), np.asarray(dones, dtype=np.float32)
+        )
         # rtgs = (rtgs - rtgs.mean()) / (rtgs.std() + 1e-7)
 
         # calculate advantages
@@ -34,6 +34,20 @@ class RDTD3:
         self.target_critic_net = copy.deepcopy(self.critic_net)
         self.target_critic_net.eval()  # never in training mode - helps with batch/drop out layers
 
+        # Compiled after the targets are copied so each network gets its own compiled forward
+        if config.use_compile:
+            for network in (
+                self.actor_net,
+                self.critic_net,
+                self.target_actor_net,
+                self.target_critic_net,
+            ):
+                hlp.compile_network(network)
+
+        # Gradients are averaged across workers when launched with torch.distributed
+        self.actor_net = hlp.wrap_distributed(self.actor_net, self.device)
+        self.critic_net = hlp.wrap_distributed(self.critic_net, self.device)
+
         self.gamma = config.gamma
         self.tau = config.tau
 
@@ -46,7 +60,10 @@ class RDTD3:
         self.learn_counter = 0
         self.policy_update_freq = config.policy_update_freq
 
-        self.action_num = self.actor_net.num_actions
+        self.action_num = actor_network.num_actions
+
+        # Only toggle eval/train around action selection when the actor has layers that depend on the mode
+        self.actor_has_mode_layers = hlp.has_mode_dependent_layers(self.actor_net)
 
         # RD-PER parameters
         self.scale_r = 1.0
@@ -63,26 +80,47 @@ class RDTD3:
     def _split_output(
         self, target: torch.Tensor
     ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-        return target[:, 0], target[:, 1], target[:, 2:]
+        # Column slices keep each output as [batch_size, n] so no reshaping is needed downstream
+        return target[:, :1], target[:, 1:2], target[:, 2:]
 
     def select_action_from_policy(
         self, state: np.ndarray, evaluation: bool = False, noise_scale: float = 0.1
     ) -> np.ndarray:
-        self.actor_net.eval()
+        if self.actor_has_mode_layers:
+            self.actor_net.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
-            state_tensor = state_tensor.unsqueeze(0)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            ).unsqueeze(0)
             action = self.actor_net(state_tensor)
-            action = action.cpu().data.numpy().flatten()
-
+            action = action.flatten().cpu().numpy()
             if not evaluation:
                 # this is part the TD3 too, add noise to the action
                 noise = np.random.normal(0, scale=noise_scale, size=self.action_num)
                 action = action + noise
                 action = np.clip(action, -1, 1)
-        self.actor_net.train()
+        if self.actor_has_mode_layers:
+            self.actor_net.train()
         return action
 
+    @torch.no_grad()
+    def _initialize_scales(
+        self,
+        diff_td_one: torch.Tensor,
+        diff_td_two: torch.Tensor,
+        diff_reward_one: torch.Tensor,
+        diff_reward_two: torch.Tensor,
+        diff_next_states_one: torch.Tensor,
+        diff_next_states_two: torch.Tensor,
+    ) -> None:
+        # Scale the reward and next state errors to the TD error of the first batch
+        td_err = torch.cat([diff_td_one, diff_td_two], -1).mean()
+        reward_err = torch.cat([diff_reward_one, diff_reward_two], -1).mean()
+        state_err = torch.cat([diff_next_states_one, diff_next_states_two], -1).mean()
+
+        self.scale_r = (td_err / reward_err).item()
+        self.scale_s = (td_err / state_err).item()
+
     def _update_critic(
         self,
         states: torch.Tensor,
@@ -91,36 +129,21 @@ class RDTD3:
         next_states: torch.Tensor,
         dones: torch.Tensor,
         weights: torch.Tensor,
-    ) -> tuple[float, np.ndarray]:
+    ) -> tuple[torch.Tensor, torch.Tensor]:
         # Get current Q estimates
         output_one, output_two = self.critic_net(states.detach(), actions.detach())
         q_value_one, reward_one, next_states_one = self._split_output(output_one)
         q_value_two, reward_two, next_states_two = self._split_output(output_two)
 
-        diff_reward_one = 0.5 * torch.pow(
-            reward_one.reshape(-1, 1) - rewards.reshape(-1, 1), 2.0
-        ).reshape(-1, 1)
-        diff_reward_two = 0.5 * torch.pow(
-            reward_two.reshape(-1, 1) - rewards.reshape(-1, 1), 2.0
-        ).reshape(-1, 1)
-
-        diff_next_states_one = 0.5 * torch.mean(
-            torch.pow(
-                next_states_one - next_states,
-                2.0,
-            ),
-            -1,
+        diff_reward_one = 0.5 * (reward_one - rewards).pow(2)
+        diff_reward_two = 0.5 * (reward_two - rewards).pow(2)
+
+        diff_next_states_one = 0.5 * (next_states_one - next_states).pow(2).mean(
+            -1, keepdim=True
         )
-        diff_next_states_one = diff_next_states_one.reshape(-1, 1)
-
-        diff_next_states_two = 0.5 * torch.mean(
-            torch.pow(
-                next_states_two - next_states,
-                2.0,
-            ),
-            -1,
+        diff_next_states_two = 0.5 * (next_states_two - next_states).pow(2).mean(
+            -1, keepdim=True
         )
-        diff_next_states_two = diff_next_states_two.reshape(-1, 1)
 
         with torch.no_grad():
             next_actions = self.target_actor_net(next_states)
@@ -134,14 +157,15 @@ class RDTD3:
             )
             next_values_one, _, _ = self._split_output(target_q_values_one)
             next_values_two, _, _ = self._split_output(target_q_values_two)
-            target_q_values = torch.minimum(next_values_one, next_values_two).reshape(
-                -1, 1
-            )
+            target_q_values = torch.minimum(next_values_one, next_values_two)
 
-            q_target = rewards + self.gamma * (1 - dones) * target_q_values
+            # Terminal transitions have no bootstrapped value - masked in a single pass
+            q_target = (
+                target_q_values.masked_fill(dones, 0.0).mul_(self.gamma).add_(rewards)
+            )
 
-        diff_td_one = F.mse_loss(q_value_one.reshape(-1, 1), q_target, reduction="none")
-        diff_td_two = F.mse_loss(q_value_two.reshape(-1, 1), q_target, reduction="none")
+        diff_td_one = F.mse_loss(q_value_one, q_target, reduction="none")
+        diff_td_two = F.mse_loss(q_value_two, q_target, reduction="none")
 
         critic_one_loss = (
             diff_td_one
@@ -168,38 +192,30 @@ class RDTD3:
             torch.max(diff_reward_one, diff_reward_two)
             .clamp(min=self.min_priority)
             .pow(self.per_alpha)
-            .cpu()
-            .data.numpy()
-            .flatten()
+            .detach()
         )
 
         # Update Scales
         if self.learn_counter == 1:
-            td_err = torch.cat([diff_td_one, diff_td_two], -1)
-            mean_td_err = torch.mean(td_err, 1)
-            mean_td_err = mean_td_err.view(-1, 1)
-            numpy_td_err = mean_td_err[:, 0].detach().data.cpu().numpy()
-
-            reward_err = torch.cat([diff_reward_one, diff_reward_two], -1)
-            mean_reward_err = torch.mean(reward_err, 1)
-            mean_reward_err = mean_reward_err.view(-1, 1)
-            numpy_reward_err = mean_reward_err[:, 0].detach().data.cpu().numpy()
-
-            state_err = torch.cat([diff_next_states_one, diff_next_states_two], -1)
-            mean_state_err = torch.mean(state_err, 1)
-            mean_state_err = mean_state_err.view(-1, 1)
-            numpy_state_err = mean_state_err[:, 0].detach().data.cpu().numpy()
-
-            self.scale_r = np.mean(numpy_td_err) / (np.mean(numpy_reward_err))
-            self.scale_s = np.mean(numpy_td_err) / (np.mean(numpy_state_err))
+            self._initialize_scales(
+                diff_td_one,
+                diff_td_two,
+                diff_reward_one,
+                diff_reward_two,
+                diff_next_states_one,
+                diff_next_states_two,
+            )
 
-        return critic_loss_total.item(), priorities
+        # Returned on the device - the caller reads them back once the remaining updates are queued
+        return critic_loss_total.detach(), priorities
 
     def _update_actor(self, states: torch.Tensor) -> float:
         actions = self.actor_net(states.detach())
 
-        with hlp.evaluating(self.critic_net):
-            actor_q_one, actor_q_two = self.critic_net(states.detach(), actions)
+        # The critic gradients from the actor loss are discarded, so they are not synced across workers
+        critic_net = hlp.unwrap_network(self.critic_net)
+        with hlp.evaluating(critic_net):
+            actor_q_one, actor_q_two = critic_net(states.detach(), actions)
 
         actor_q_values = torch.minimum(actor_q_one, actor_q_two)
         actor_val, _, _ = self._split_output(actor_q_values)
@@ -220,20 +236,18 @@ class RDTD3:
         experiences = memory.sample_priority(batch_size)
         states, actions, rewards, next_states, dones, indices, weights = experiences
 
-        batch_size = len(states)
-
         # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensor = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
-        weights_tensor = torch.FloatTensor(np.asarray(weights)).to(self.device)
+        states_tensor = hlp.to_tensor(states, self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
+        next_states_tensor = hlp.to_tensor(next_states, self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.bool_)
+        weights_tensor = hlp.to_tensor(weights, self.device)
 
         # Reshape to batch_size
-        rewards_tensor = rewards_tensor.unsqueeze(0).reshape(batch_size, 1)
-        dones_tensor = dones_tensor.unsqueeze(0).reshape(batch_size, 1)
-        weights_tensor = weights_tensor.unsqueeze(0).reshape(batch_size, 1)
+        rewards_tensor = rewards_tensor.view(-1, 1)
+        dones_tensor = dones_tensor.view(-1, 1)
+        weights_tensor = weights_tensor.view(-1, 1)
 
         info = {}
 
@@ -246,7 +260,6 @@ class RDTD3:
             dones_tensor,
             weights_tensor,
         )
-        info["critic_loss_total"] = critic_loss_total
 
         if self.learn_counter % self.policy_update_freq == 0:
             # Update Actor
@@ -257,19 +270,34 @@ class RDTD3:
             hlp.soft_update_params(self.critic_net, self.target_critic_net, self.tau)
             hlp.soft_update_params(self.actor_net, self.target_actor_net, self.tau)
 
-        memory.update_priorities(indices, priorities)
+        info["critic_loss_total"] = critic_loss_total.item()
+        memory.update_priorities(indices, priorities.cpu().numpy().flatten())
 
         return info
 
     def save_models(self, filepath: str, filename: str) -> None:
+        # Every worker holds the same weights, so only the main process writes them
+        if not hlp.is_main_process():
+            return
+
         if not os.path.exists(filepath):
             os.makedirs(filepath)
 
-        torch.save(self.actor_net.state_dict(), f"{filepath}/{filename}_actor.pht")
-        torch.save(self.critic_net.state_dict(), f"{filepath}/{filename}_critic.pht")
+        actor_net = hlp.unwrap_network(self.actor_net)
+        critic_net = hlp.unwrap_network(self.critic_net)
+        torch.save(actor_net.state_dict(), f"{filepath}/{filename}_actor.pht")
+        torch.save(critic_net.state_dict(), f"{filepath}/{filename}_critic.pht")
         logging.info("models has been saved...")
 
     def load_models(self, filepath: str, filename: str) -> None:
-        self.actor_net.load_state_dict(torch.load(f"{filepath}/{filename}_actor.pht"))
-        self.critic_net.load_state_dict(torch.load(f"{filepath}/{filename}_critic.pht"))
+        actor_path = f"{filepath}/{filename}_actor.pht"
+        critic_path = f"{filepath}/{filename}_critic.pht"
+
+        # Load the weights straight onto the device and skip unpickling arbitrary objects
+        hlp.unwrap_network(self.actor_net).load_state_dict(
+            torch.load(actor_path, map_location=self.device, weights_only=True)
+        )
+        hlp.unwrap_network(self.critic_net).load_state_dict(
+            torch.load(critic_path, map_location=self.device, weights_only=True)
+        )
         logging.info("models has been loaded...")
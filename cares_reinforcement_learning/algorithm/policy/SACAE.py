@@ -110,9 +110,9 @@ class SACAE:
             state_tensor = hlp.image_state_dict_to_tensor(state, self.device)
 
             if evaluation:
-                (_, _, action) = self.actor_net(state_tensor)
+                _, _, action = self.actor_net(state_tensor)
             else:
-                (action, _, _) = self.actor_net(state_tensor)
+                action, _, _ = self.actor_net(state_tensor)
             action = action.cpu().data.numpy().flatten()
         self.actor_net.train()
         return action
@@ -161,10 +161,19 @@ class SACAE:
     def _update_actor_alpha(
         self, states: dict[str, torch.Tensor]
     ) -> tuple[float, float]:
-        pi, log_pi, _ = self.actor_net(states, detach_encoder=True)
+        # The actor and critic encoders share their conv weights and both detach at the CNN here,
+        # so the conv features are computed once and fed to both
+        with torch.no_grad():
+            conv_features = self.critic_net.encoder.forward_conv(states["image"])
+
+        pi, log_pi, _ = self.actor_net(
+            states, detach_encoder=True, conv_features=conv_features
+        )
 
         with hlp.evaluating(self.critic_net):
-            qf1_pi, qf2_pi = self.critic_net(states, pi, detach_encoder=True)
+            qf1_pi, qf2_pi = self.critic_net(
+                states, pi, detach_encoder=True, conv_features=conv_features
+            )
 
         min_qf_pi = torch.minimum(qf1_pi, qf2_pi)
         actor_loss = ((self.alpha * log_pi) - min_qf_pi).mean()
@@ -210,12 +219,12 @@ class SACAE:
 
         states_tensor = hlp.image_states_dict_to_tensor(states, self.device)
 
-        actions_tensor = torch.FloatTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
 
         next_states_tensor = hlp.image_states_dict_to_tensor(next_states, self.device)
 
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         # Reshape to batch_size x whatever
         rewards_tensor = rewards_tensor.unsqueeze(0).reshape(batch_size, 1)
@@ -59,7 +59,9 @@ class DQN:
     def select_action_from_policy(self, state) -> float:
         self.network.eval()
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).to(self.device)
+            state_tensor = torch.as_tensor(
+                state, dtype=torch.float32, device=self.device
+            )
             state_tensor = state_tensor.unsqueeze(0)
             q_values = self.network(state_tensor)
             action = torch.argmax(q_values).item()
@@ -108,14 +110,14 @@ class DQN:
             states, actions, rewards, next_states, dones, _ = experiences
 
         # Convert into tensor
-        states_tensor = torch.FloatTensor(np.asarray(states)).to(self.device)
-        actions_tensor = torch.LongTensor(np.asarray(actions)).to(self.device)
-        rewards_tensor = torch.FloatTensor(np.asarray(rewards)).to(self.device)
-        next_states_tensor = torch.FloatTensor(np.asarray(next_states)).to(self.device)
-        dones_tensor = torch.LongTensor(np.asarray(dones)).to(self.device)
+        states_tensor = hlp.to_tensor(states, self.device)
+        actions_tensor = hlp.to_tensor(actions, self.device, dtype=np.int64)
+        rewards_tensor = hlp.to_tensor(rewards, self.device)
+        next_states_tensor = hlp.to_tensor(next_states, self.device)
+        dones_tensor = hlp.to_tensor(dones, self.device, dtype=np.int64)
 
         if self.use_per_buffer:
-            weights_tensor = torch.FloatTensor(np.asarray(weights)).to(self.device)
+            weights_tensor = hlp.to_tensor(weights, self.device)
 
         info = {}
 
@@ -1,6 +1,7 @@
 from typing import Any
 
 import torch
+import torch.nn.functional as F
 from torch import nn
 
 import cares_reinforcement_learning.util.helpers as hlp
@@ -13,6 +14,14 @@ def tie_weights(src, trg):
     trg.bias = src.bias
 
 
+@torch.jit.script
+def layer_norm_tanh(
+    h: torch.Tensor, weight: torch.Tensor, bias: torch.Tensor, eps: float
+) -> torch.Tensor:
+    # LayerNorm and tanh scripted together so the fuser can emit the tail as one kernel after the fc GEMM
+    return torch.tanh(F.layer_norm(h, [h.shape[-1]], weight, bias, eps))
+
+
 class VanillaAutoencoder(nn.Module):
     """
     An image-based autoencoder model consisting of an encoder and a decoder pair.
@@ -193,30 +202,40 @@ class Encoder(nn.Module):
         self.fc = nn.Linear(self.n_flatten, self.latent_dim)
         self.ln = nn.LayerNorm(self.latent_dim)
 
+        # NHWC conv weights map directly onto cuDNN's tensor core kernels
+        self.convs.to(memory_format=torch.channels_last)  # type: ignore
+
     def copy_conv_weights_from(self, source):
         # Only tie conv layers
         for i in range(self.num_layers):
             tie_weights(src=source.convs[i], trg=self.convs[i])
 
-    def _forward_conv(self, x: torch.Tensor) -> torch.Tensor:
-        conv = torch.relu(self.convs[0](x))
-        for i in range(1, self.num_layers):
-            conv = torch.relu(self.convs[i](conv))
+    def forward_conv(self, x: torch.Tensor) -> torch.Tensor:
+        conv = x.contiguous(memory_format=torch.channels_last)
+        # Iterates the convs directly and applies relu in place on each fresh conv output
+        for layer in self.convs:
+            conv = torch.relu_(layer(conv))
         h = torch.flatten(conv, start_dim=1)
         return h
 
     def forward(
-        self, obs: torch.Tensor, detach_cnn: bool = False, detach_output: bool = False
+        self,
+        obs: torch.Tensor,
+        detach_cnn: bool = False,
+        detach_output: bool = False,
+        conv_features: torch.Tensor | None = None,
     ) -> torch.Tensor:
-        h = self._forward_conv(obs)
+        # Conv features already computed for obs (e.g. by a tied encoder) skip the conv stack
+        h = self.forward_conv(obs) if conv_features is None else conv_features
 
         # SAC AE detaches at the CNN layer
         if detach_cnn:
             h = h.detach()
 
         h_fc = self.fc(h)
-        h_norm = self.ln(h_fc)
-        latent_observation = torch.tanh(h_norm)
+        latent_observation = layer_norm_tanh(
+            h_fc, self.ln.weight, self.ln.bias, self.ln.eps
+        )
 
         # NaSATD3 detatches the encoder output
         if detach_output:
@@ -270,14 +289,18 @@ class Decoder(nn.Module):
             )
         )
 
+        # NHWC conv weights map directly onto cuDNN's tensor core kernels
+        self.deconvs.to(memory_format=torch.channels_last)  # type: ignore
+
     def forward(self, latent_observation: torch.Tensor) -> torch.Tensor:
         h_fc = self.fc(latent_observation)
         h_fc = torch.relu(h_fc)
 
         deconv = h_fc.view(-1, self.num_filters, self.out_dim, self.out_dim)
+        deconv = deconv.contiguous(memory_format=torch.channels_last)
 
-        for i in range(0, self.num_layers - 1):
-            deconv = torch.relu(self.deconvs[i](deconv))
+        for layer in self.deconvs[:-1]:
+            deconv = torch.relu_(layer(deconv))
 
         observation = self.deconvs[-1](deconv)
 
@@ -9,6 +9,7 @@ import pickle
 import random
 
 import numpy as np
+import numpy.typing as npt
 
 from cares_reinforcement_learning.memory import SumTree
 
@@ -25,13 +26,22 @@ class MemoryBuffer:
         min_priority (float): The minimum priority value. Default is 1e-4 - just above 0.
         beta (float): The initial value of the beta parameter for importance weight calculation. Default is 0.4.
         d_beta (float): The rate of change for the beta parameter. Default is 6e-7 - presumned over 1,000,000 steps.
+        fields (list | None): Keyword-only. The (shape, dtype) of each experience type to preallocate.
+            Default is None - allocated on the first add.
+        location (str | None): Keyword-only. File path prefix to back the typed buffers with numpy memmaps.
+            Default is None - held in memory.
+            Each buffer needs its own prefix: the files are opened with mode "w+", so a second buffer at the same location
+            truncates and then shares them, and clear() (and flush()) zeroes them. The files are not removed with the buffer.
+            A saved buffer does not stay file-backed - save() pickles the contents and load() returns in-memory arrays.
         **priority_params: Additional parameters for priority calculation.
 
     Attributes:
         priority_params (dict): Additional parameters for priority calculation.
         max_capacity (int): The maximum capacity of the buffer.
         current_size (int): The current size of the buffer.
-        memory_buffers (list): An array of buffers for each experience type.
+        memory_buffers (list): An array of buffers for each experience type - typed for numeric data, objects otherwise.
+        fields (list | None): The (shape, dtype) of each experience type to preallocate, if known at construction.
+        location (str | None): The file path prefix of the memmap files backing the typed buffers, if any.
         sum_tree (SumTree): The SumTree data structure for efficient sampling based on priorities.
         inverse_tree (SumTree): The SumTree data structure for efficient sampling based on inverse priorities.
         tree_pointer (int): The location to add the next item into the tree.
@@ -39,15 +49,21 @@ class MemoryBuffer:
         init_beta (float): The initial value of the beta parameter.
         beta (float): The current value of the beta parameter.
         d_beta (float): The rate of change for the beta parameter.
-        max_priority (float): The maximum priority value in the buffer.
+        initial_priority (float): The lower bound of the max priority, used before any priorities are set.
+        max_priority (float): The maximum priority value in the buffer - read from the running maximum of the sum tree.
 
     Methods:
         __len__(): Returns the current size of the buffer.
         add(state, action, reward, next_state, done, *extra): Adds a single experience to the buffer.
+        _allocate_fields(): Preallocates the buffers for the experience types given at construction.
+        _new_typed_buffer(shape, dtype): Allocates one typed buffer, in memory or as a memmap file.
+        _create_buffer(exp): Creates the storage for one experience type based on its first experience.
+        _extract_experiences(indices): Extracts the experiences at the given indices from the buffer.
         sample_uniform(batch_size): Samples experiences uniformly from the buffer.
         _importance_sampling_prioritised_weights(indices, weight_normalisation): Calculates the importance-sampling weights for prioritized replay.
         sample_priority(batch_size, sampling, weight_normalisation): Samples experiences from the buffer based on priorities.
         sample_inverse_priority(batch_size): Samples experiences from the buffer based on inverse priorities.
+        _inverse_priority(priorities): Calculates the inverse priorities stored in the inverse tree.
         update_priorities(indices, priorities): Updates the priorities of the buffer at the given indices.
         flush(): Flushes the memory buffers and returns the experiences in order.
         sample_consecutive(batch_size): Randomly samples consecutive experiences from the memory buffer.
@@ -61,6 +77,9 @@ class MemoryBuffer:
         min_priority: float = 1e-4,
         beta: float = 0.4,
         d_beta: float = 6e-7,
+        *,
+        fields: list[tuple[tuple[int, ...], npt.DTypeLike]] | None = None,
+        location: str | None = None,
         **priority_params,
     ):
         # pylint: disable-next=unused-argument
@@ -80,6 +99,14 @@ class MemoryBuffer:
         # 5 ... = [] e.g. log_prob = []
         # n ... = []
 
+        # Optional (shape, dtype) of each experience type - preallocated here instead of on the first add
+        self.fields = fields
+
+        # Optional memmap file prefix - large buffers live in the OS page cache instead of the process heap
+        self.location = location
+
+        self._allocate_fields()
+
         # The SumTree is an efficient data structure for sampling based on priorities
         self.sum_tree = SumTree(self.max_capacity)
         self.inverse_tree = SumTree(self.max_capacity)
@@ -95,8 +122,8 @@ class MemoryBuffer:
         self.beta = self.init_beta
         self.d_beta = d_beta
 
-        # Current max priority
-        self.max_priority = 1.0
+        # Lower bound of the max priority - the running max itself is kept by the sum tree
+        self.initial_priority = 1.0
 
     def __len__(self) -> int:
         """
@@ -107,6 +134,16 @@ class MemoryBuffer:
         """
         return self.current_size
 
+    @property
+    def max_priority(self) -> float:
+        """
+        The maximum priority set in the buffer so far, and at least the initial priority.
+
+        Returns:
+            float: The priority given to newly added experiences.
+        """
+        return max(self.initial_priority, self.sum_tree.max_value)
+
     def add(self, state, action, reward, next_state, done, *extra) -> None:
         """
         Adds a single experience to the prioritized replay buffer.
@@ -126,23 +163,100 @@ class MemoryBuffer:
         """
         experience = [state, action, reward, next_state, done, *extra]
 
-        # Iterate over the list of experiences (state, action, reward, next_state, done, ...) and add them to the buffer
-        for index, exp in enumerate(experience):
-            # Dynamically create the full memory size on first experience
-            if index >= len(self.memory_buffers):
-                # NOTE: This is a list of numpy arrays in order to use index extraction in sample O(1)
-                memory = np.array([None] * self.max_capacity)
-                self.memory_buffers.append(memory)
+        # Dynamically create the full memory size for any experience type not seen (or preallocated) yet
+        for exp in experience[len(self.memory_buffers) :]:
+            self.memory_buffers.append(self._create_buffer(exp))
 
+        # Iterate over the list of experiences (state, action, reward, next_state, done, ...) and add them to the buffer
+        for buffer, exp in zip(self.memory_buffers, experience):
             # This adds to the latest position in the buffer
-            self.memory_buffers[index][self.tree_pointer] = exp
+            buffer[self.tree_pointer] = exp
 
         new_priority = self.max_priority
         self.sum_tree.set(self.tree_pointer, new_priority)
+        self.inverse_tree.set(self.tree_pointer, self._inverse_priority(new_priority))
 
         self.tree_pointer = (self.tree_pointer + 1) % self.max_capacity
         self.current_size = min(self.current_size + 1, self.max_capacity)
 
+    def _allocate_fields(self) -> None:
+        """
+        Preallocates the full size buffer for each experience type given at construction.
+
+        The fields are in the order: state, action, reward, next_state, done, ...
+        """
+        if self.fields is None:
+            return
+
+        for shape, dtype in self.fields:
+            self.memory_buffers.append(self._new_typed_buffer(shape, dtype))
+
+    def _new_typed_buffer(
+        self, shape: tuple[int, ...], dtype: npt.DTypeLike
+    ) -> np.ndarray:
+        """
+        Allocates the zeroed full size buffer for the next experience type.
+
+        When a location is set the buffer is a numpy memmap at "{location}.{index}" - it supports the same indexing and
+        gathers as an in-memory array.
+
+        Args:
+            shape (tuple): The shape of a single experience of this type.
+            dtype (npt.DTypeLike): The numpy dtype to store the experiences as.
+
+        Returns:
+            np.ndarray: The empty buffer with max_capacity entries.
+        """
+        if self.location is None:
+            return np.zeros((self.max_capacity, *shape), dtype=dtype)
+
+        return np.memmap(
+            f"{self.location}.{len(self.memory_buffers)}",
+            dtype=dtype,
+            mode="w+",
+            shape=(self.max_capacity, *shape),
+        )
+
+    def _create_buffer(self, exp) -> np.ndarray:
+        """
+        Creates the full size buffer for one experience type based on its first experience.
+
+        Numeric scalars and vectors (e.g. vector states, actions, rewards, dones) are stored in a contiguous typed array -
+        bool for flags and float32 otherwise - so sampling is a single gather and the result converts to a tensor without copying.
+        Anything else (e.g. image or dictionary observations) is stored as an array of objects.
+
+        Args:
+            exp: The first experience of this type to be added to the buffer.
+
+        Returns:
+            np.ndarray: The empty buffer with max_capacity entries.
+        """
+        value = np.asarray(exp)
+        if value.ndim <= 1 and value.dtype.kind in "biuf":
+            dtype = np.bool_ if value.dtype.kind == "b" else np.float32
+            return self._new_typed_buffer(value.shape, dtype)
+
+        # NOTE: This is a list of numpy arrays in order to use index extraction in sample O(1)
+        return np.array([None] * self.max_capacity)
+
+    def _extract_experiences(self, indices: np.ndarray) -> list:
+        """
+        Extracts the experiences at the given indices from each of the memory buffers.
+
+        Args:
+            indices (np.ndarray): The indices of the experiences to extract.
+
+        Returns:
+            list: The experiences in the order: state, action, reward, next_state, done, ...
+                - Typed experiences are returned as numpy arrays.
+                - Object experiences (e.g. image or dictionary observations) are returned as lists.
+        """
+        # NOTE: object buffers are converted back to a standard list here
+        return [
+            buffer[indices].tolist() if buffer.dtype == object else buffer[indices]
+            for buffer in self.memory_buffers
+        ]
+
     def sample_uniform(self, batch_size: int) -> tuple:
         """
         Samples experiences uniformly from the buffer.
@@ -159,11 +273,7 @@ class MemoryBuffer:
         batch_size = min(batch_size, self.current_size)
         indices = np.random.randint(self.current_size, size=batch_size)
 
-        # Extracts the experiences at the desired indices from the buffer
-        experiences = []
-        for buffer in self.memory_buffers:
-            # NOTE: we convert back to a standard list here
-            experiences.append(buffer[indices].tolist())
+        experiences = self._extract_experiences(indices)
 
         return (*experiences, indices.tolist())
 
@@ -255,11 +365,7 @@ class MemoryBuffer:
         # prioritizes sampling more aggressively at the same time as correcting for it more strongly.
         self.beta = min(self.beta + self.d_beta, 1.0)
 
-        # Extracts the experiences at the desired indices from the buffer
-        experiences = []
-        for buffer in self.memory_buffers:
-            # NOTE: we convert back to a standard list here
-            experiences.append(buffer[indices].tolist())
+        experiences = self._extract_experiences(indices)
 
         return (
             *experiences,
@@ -284,30 +390,38 @@ class MemoryBuffer:
         # If batch size is greater than size we need to limit it to just the data that exists
         batch_size = min(batch_size, self.current_size)
 
-        top_value = self.sum_tree.levels[0][0]
+        # The inverse tree is kept up to date as priorities change, so sampling is a single tree walk
+        indices = self.inverse_tree.sample_simple(batch_size)
 
-        # TODO add inverse (1 - prob into SumTree instead)
         # Inverse based on paper for LA3PD - https://arxiv.org/abs/2209.00532
-        reversed_priorities = top_value / (
-            self.sum_tree.levels[-1][: self.current_size] + 1e-6
+        top_value = self.sum_tree.levels[0][0]
+        reversed_priorities = top_value * self._inverse_priority(
+            self.sum_tree.levels[-1][indices]
         )
 
-        self.inverse_tree.batch_set(np.arange(self.current_size), reversed_priorities)
-
-        indices = self.inverse_tree.sample_simple(batch_size)
-
-        # Extracts the experiences at the desired indices from the buffer
-        experiences = []
-        for buffer in self.memory_buffers:
-            # NOTE: we convert back to a standard list here
-            experiences.append(buffer[indices].tolist())
+        experiences = self._extract_experiences(indices)
 
         return (
             *experiences,
             indices.tolist(),
-            reversed_priorities[indices].tolist(),
+            reversed_priorities.tolist(),
         )
 
+    def _inverse_priority(self, priorities):
+        """
+        Calculates the inverse priorities stored in the inverse tree.
+
+        The inverse sampling probabilities are top_value / (priority + 1e-6) normalised over the buffer, the top_value
+        cancels out so the tree only needs 1 / (priority + 1e-6) and can be updated along with the priorities.
+
+        Args:
+            priorities (float | np.ndarray): The priorities to invert.
+
+        Returns:
+            float | np.ndarray: The inverse priorities.
+        """
+        return 1.0 / (priorities + 1e-6)
+
     def update_priorities(self, indices: np.ndarray, priorities: np.ndarray) -> None:
         """
         Update the priorities of the replay buffer at the given indices.
@@ -319,8 +433,8 @@ class MemoryBuffer:
         Returns:
         None
         """
-        self.max_priority = max(priorities.max(), self.max_priority)
         self.sum_tree.batch_set(indices, priorities)
+        self.inverse_tree.batch_set(indices, self._inverse_priority(priorities))
 
     def flush(self) -> list[tuple]:
         """
@@ -368,16 +482,8 @@ class MemoryBuffer:
                 if (not done) and (i not in sampled_indices):
                     sampled_indices.append(i)
 
-        experiences = []
-        for buffer in self.memory_buffers:
-            # NOTE: we convert back to a standard list here
-            experiences.append(buffer[np.array(sampled_indices)].tolist())
-
-        next_sampled_indices = (np.array(sampled_indices) + 1).tolist()
-
-        for buffer in self.memory_buffers:
-            # NOTE: we convert back to a standard list here
-            experiences.append(buffer[np.array(next_sampled_indices)].tolist())
+        experiences = self._extract_experiences(np.array(sampled_indices))
+        experiences += self._extract_experiences(np.array(sampled_indices) + 1)
 
         return (*experiences, sampled_indices)
 
@@ -414,14 +520,16 @@ class MemoryBuffer:
         """
         Clears the prioritised replay buffer.
 
-        Resets the pointer, size, memory buffers, sum tree, max priority, and beta values.
+        Resets the pointer, size, memory buffers, sum trees, max priority, and beta values.
         """
         self.tree_pointer = 0
         self.current_size = 0
         self.memory_buffers = []
+        self._allocate_fields()
 
         self.sum_tree = SumTree(self.max_capacity)
-        self.max_priority = self.min_priority
+        self.inverse_tree = SumTree(self.max_capacity)
+        self.initial_priority = self.min_priority
         self.beta = self.init_beta
 
     def save(self, filepath: str, file_name: str) -> None:
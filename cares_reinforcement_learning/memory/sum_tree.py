@@ -48,6 +48,9 @@ class SumTree:
             level_size *= 2
             self.levels.append(np.zeros(level_size))
 
+        # Running maximum of every value set in the tree
+        self.max_value = 0.0
+
     def sample_value(self, query_value: float | None = None) -> int:
         """Samples an element from the sum tree.
 
@@ -103,13 +106,9 @@ class SumTree:
 
         bounds = np.linspace(0.0, 1.0, batch_size + 1)
 
-        segments = [(bounds[i], bounds[i + 1]) for i in range(batch_size)]
-
-        query_values = [
-            random.uniform(segment[0], segment[1]) * self.levels[0][0]
-            for segment in segments
-        ]
-        return self._retrieve(np.array(query_values))
+        # One uniform sample within each segment [bounds[i], bounds[i + 1]) - drawn for all segments at once
+        query_values = np.random.uniform(bounds[:-1], bounds[1:]) * self.levels[0][0]
+        return self._retrieve(query_values)
 
     def _retrieve(self, values: np.ndarray) -> np.ndarray:
         """
@@ -150,10 +149,13 @@ class SumTree:
         Returns:
             None
         """
+        self.max_value = max(self.max_value, new_priority)
+
         priority_diff = new_priority - self.levels[-1][ind]
 
+        # A single index can't repeat, so a plain in-place add is enough here - np.add.at is only needed for batches
         for nodes in self.levels[::-1]:
-            np.add.at(nodes, ind, priority_diff)
+            nodes[ind] += priority_diff
             ind //= 2
 
     def batch_set(self, ind: np.ndarray, new_priority: np.ndarray) -> None:
@@ -168,6 +170,8 @@ class SumTree:
             None
         """
 
+        self.max_value = max(self.max_value, new_priority.max())
+
         # Confirm we don't increment a node twice
         ind, unique_ind = np.unique(ind, return_index=True)
         priority_diff = new_priority[unique_ind] - self.levels[-1][ind]
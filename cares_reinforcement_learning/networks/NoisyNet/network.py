@@ -1,6 +1,6 @@
 import torch
 from torch import nn
-from cares_reinforcement_learning.networks.common import MLP, NoisyLinear
+from cares_reinforcement_learning.networks.common import MLP, NoisyLinear, scale_noise
 from cares_reinforcement_learning.util.configurations import NoisyNetConfig
 
 
@@ -9,13 +9,32 @@ class BaseNetwork(nn.Module):
         super().__init__()
         self.network = network
 
+        # Cached once so resetting the noise doesn't walk every module
+        self.noisy_layers = [
+            module
+            for module in self.network.modules()
+            if isinstance(module, NoisyLinear)
+        ]
+        self.noise_sizes = [
+            size
+            for layer in self.noisy_layers
+            for size in (layer.in_features, layer.out_features)
+        ]
+
     def forward(self, state: torch.Tensor) -> torch.Tensor:
         return self.network(state)
 
     def reset_noise(self):
-        for module in self.network.modules():
-            if hasattr(module, "reset_noise"):
-                module.reset_noise()
+        if not self.noisy_layers:
+            return
+
+        # The noise for every layer is drawn and scaled in one call, then split between the layers
+        device = self.noisy_layers[0].weight_mu.device
+        noise = scale_noise(torch.randn(sum(self.noise_sizes), device=device))
+        epsilons = noise.split(self.noise_sizes)
+
+        for i, layer in enumerate(self.noisy_layers):
+            layer.set_noise(epsilons[2 * i], epsilons[2 * i + 1])
 
 
 class DefaultNetwork(BaseNetwork):
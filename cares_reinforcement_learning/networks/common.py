@@ -160,6 +160,16 @@ class GaussianPolicy(BasePolicy):
         return sample, log_pi, dist.mean
 
 
+@torch.jit.script
+def rescale_log_std(
+    log_std: torch.Tensor, log_std_min: float, log_std_max: float
+) -> torch.Tensor:
+    # Squashes log_std into [log_std_min, log_std_max] and returns the std - scripted as one pointwise chain
+    return torch.exp(
+        log_std_min + 0.5 * (log_std_max - log_std_min) * (torch.tanh(log_std) + 1.0)
+    )
+
+
 class TanhGaussianPolicy(BasePolicy):
     def __init__(
         self,
@@ -170,7 +180,8 @@ class TanhGaussianPolicy(BasePolicy):
     ):
         super().__init__(input_size, num_actions)
 
-        self.log_std_bounds = log_std_bounds
+        # Stored as floats so they are passed to the scripted rescale as constants
+        self.log_std_bounds = [float(bound) for bound in log_std_bounds]
 
         self.act_net: MLP | nn.Sequential = MLP(
             input_size=input_size,
@@ -193,16 +204,12 @@ class TanhGaussianPolicy(BasePolicy):
         # employ the change of variables formula to compute the likelihoods of the bounded actions
 
         # constrain log_std inside [log_std_min, log_std_max]
-        log_std = torch.tanh(log_std)
-
         log_std_min, log_std_max = self.log_std_bounds
-        log_std = log_std_min + 0.5 * (log_std_max - log_std_min) * (log_std + 1)
-
-        std = log_std.exp()
+        std = rescale_log_std(log_std, log_std_min, log_std_max)
 
         dist = SquashedNormal(mu, std)
         sample = dist.rsample()
-        log_pi = dist.log_prob(sample).sum(-1, keepdim=True)
+        log_pi = dist.log_prob_sum(sample)
 
         return sample, log_pi, dist.mean
 
@@ -343,10 +350,15 @@ class EncoderPolicy(nn.Module):
         self.apply(hlp.weight_init)
 
     def forward(  # type: ignore
-        self, state: dict[str, torch.Tensor], detach_encoder: bool = False
+        self,
+        state: dict[str, torch.Tensor],
+        detach_encoder: bool = False,
+        conv_features: torch.Tensor | None = None,
     ) -> torch.Tensor | tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         # Detach at the CNN layer to prevent backpropagation through the encoder
-        state_latent = self.encoder(state["image"], detach_cnn=detach_encoder)
+        state_latent = self.encoder(
+            state["image"], detach_cnn=detach_encoder, conv_features=conv_features
+        )
 
         actor_input = state_latent
         if self.add_vector_observation:
@@ -376,9 +388,12 @@ class EncoderCritic(nn.Module):
         state: dict[str, torch.Tensor],
         action: torch.Tensor,
         detach_encoder: bool = False,
+        conv_features: torch.Tensor | None = None,
     ) -> torch.Tensor | tuple[torch.Tensor, torch.Tensor]:
         # Detach at the CNN layer to prevent backpropagation through the encoder
-        state_latent = self.encoder(state["image"], detach_cnn=detach_encoder)
+        state_latent = self.encoder(
+            state["image"], detach_cnn=detach_encoder, conv_features=conv_features
+        )
 
         critic_input = state_latent
         if self.add_vector_observation:
@@ -483,6 +498,20 @@ class StableTanhTransform(TanhTransform):
         return self.atanh(y)
 
 
+@torch.jit.script
+def squashed_normal_log_prob_sum(
+    x: torch.Tensor, loc: torch.Tensor, scale: torch.Tensor
+) -> torch.Tensor:
+    # Gaussian log-density of the pre-tanh sample minus the tanh log-det-Jacobian, reduced over actions in one pass
+    log_prob = (
+        -0.5 * ((x - loc) / scale) ** 2
+        - scale.log()
+        - 0.5 * math.log(2.0 * math.pi)
+        - 2.0 * (math.log(2.0) - x - F.softplus(-2.0 * x))
+    )
+    return log_prob.sum(-1, keepdim=True)
+
+
 # These methods are not required for the purposes of SAC and are thus intentionally ignored
 # pylint: disable=abstract-method
 class SquashedNormal(TransformedDistribution):
@@ -501,6 +530,11 @@ class SquashedNormal(TransformedDistribution):
             mu = tr(mu)
         return mu
 
+    def log_prob_sum(self, value: torch.Tensor) -> torch.Tensor:
+        # Joint log-prob over the action dimension, shape (B, 1) - the cached inverse recovers the pre-tanh sample
+        x = self.transforms[0].inv(value)
+        return squashed_normal_log_prob_sum(x, self.loc, self.scale)
+
 
 class NoisyLinear(nn.Module):
     def __init__(self, in_features, out_features, sigma_init=0.5):
@@ -541,6 +575,10 @@ class NoisyLinear(nn.Module):
         epsilon_in = self._scale_noise(self.in_features)
         epsilon_out = self._scale_noise(self.out_features)
 
+        self.set_noise(epsilon_in, epsilon_out)
+
+    def set_noise(self, epsilon_in: torch.Tensor, epsilon_out: torch.Tensor):
+        # Factorised Gaussian noise - the weight noise is the outer product of the scaled input and output noise
         self.weight_epsilon.data.copy_(epsilon_out.ger(epsilon_in))
         self.bias_epsilon.data.copy_(epsilon_out)
 
@@ -557,4 +595,9 @@ class NoisyLinear(nn.Module):
     def _scale_noise(self, size):
         x = torch.randn(size, device=self.weight_mu.device)
         # print(f"Raw noise stats: mean {x.mean().item():.6f}, std {x.std().item():.6f}")
-        return x.sign().mul(x.abs().sqrt())
+        return scale_noise(x)
+
+
+def scale_noise(x: torch.Tensor) -> torch.Tensor:
+    # f(x) = sgn(x) * sqrt(|x|) from the factorised Gaussian noise of NoisyNet
+    return x.sign().mul(x.abs().sqrt())
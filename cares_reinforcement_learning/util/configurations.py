@@ -84,6 +84,13 @@ class AlgorithmConfig(SubscriptableClass):
         noise_decay (float]): Noise decay.
 
         image_observation (int]): Whether the observation is an image.
+
+        allow_tf32 (bool]): Whether float32 matmuls may run in TF32 on supporting GPUs.
+            This is process-wide: creating the agent calls torch.set_float32_matmul_precision("high"),
+            which applies to every model in the process afterwards and is never reset.
+        cudnn_benchmark (bool]): Whether cuDNN may autotune its convolution algorithms for the fixed input shapes.
+            Autotuning makes the chosen kernels, and so the results, non-deterministic even when seeded.
+            This is process-wide: creating the agent sets torch.backends.cudnn.benchmark, which is never reset.
     """
 
     algorithm: str = Field(description="Name of the algorithm to be used")
@@ -101,6 +108,9 @@ class AlgorithmConfig(SubscriptableClass):
 
     image_observation: int = 0
 
+    allow_tf32: bool = False
+    cudnn_benchmark: bool = False
+
 
 ###################################
 #         DQN Algorithms          #
@@ -341,6 +351,9 @@ class SACConfig(AlgorithmConfig):
     policy_update_freq: int = 1
     target_update_freq: int = 1
 
+    # Compiles the actor network with torch.compile
+    use_compile: bool = False
+
     actor_config: MLPConfig = MLPConfig(
         layers=[
             TrainableLayer(layer_type="Linear", out_features=256),
@@ -526,6 +539,9 @@ class LA3PSACConfig(SACConfig):
 
     target_update_freq: int = 1
 
+    # Runs the critic forward pass under bfloat16 autocast
+    mixed_precision: bool = False
+
 
 class MAPERSACConfig(SACConfig):
     algorithm: str = Field("MAPERSAC", Literal=True)
@@ -778,6 +794,9 @@ class TD3Config(AlgorithmConfig):
 
     policy_update_freq: int = 2
 
+    # Compiles the actor and critic networks (and their targets) with torch.compile
+    use_compile: bool = False
+
     actor_config: MLPConfig = MLPConfig(
         layers=[
             TrainableLayer(layer_type="Linear", out_features=256),
@@ -983,6 +1002,9 @@ class LA3PTD3Config(TD3Config):
 
     policy_update_freq: int = 2
 
+    # Compiles the actor and critic networks (and their targets) with torch.compile
+    use_compile: bool = False
+
 
 class MAPERTD3Config(TD3Config):
     algorithm: str = Field("MAPERTD3", Literal=True)
@@ -1030,6 +1052,9 @@ class RDTD3Config(TD3Config):
 
     policy_update_freq: int = 2
 
+    # Compiles the actor and critic networks (and their targets) with torch.compile
+    use_compile: bool = False
+
     critic_config: MLPConfig = MLPConfig(
         layers=[
             TrainableLayer(layer_type="Linear", out_features=256),
@@ -1057,3 +1082,6 @@ class CTD4Config(TD3Config):
     policy_update_freq: int = 2
 
     fusion_method: str = "kalman"  # kalman, minimum, average
+
+    # Runs the critic forward passes under bfloat16 autocast
+    mixed_precision: bool = False
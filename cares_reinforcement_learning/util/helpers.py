@@ -1,8 +1,15 @@
+import logging
 import random
 from contextlib import contextmanager
+from typing import Any
 
 import numpy as np
+import numpy.typing as npt
 import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+
+from cares_reinforcement_learning.networks.batchrenorm import BatchRenorm
 
 
 class EpsilonScheduler:
@@ -80,6 +87,29 @@ def image_states_dict_to_tensor(
     return {"image": states_images_tensor, "vector": states_vector_tensor}
 
 
+def to_tensor(
+    data: Any, device: torch.device, dtype: npt.DTypeLike = np.float32
+) -> torch.Tensor:
+    """
+    Convert a batch of experience data (e.g. a list of states) into a tensor on the given device.
+
+    The data is stacked once into a contiguous numpy array which the tensor wraps without a further copy.
+    On CUDA devices the host tensor is pinned so the copy to the device can be issued asynchronously.
+
+    Args:
+        data (Any): The batch of data - a numpy array or a (nested) list of values.
+        device (torch.device): The device to place the tensor on.
+        dtype (npt.DTypeLike): The numpy dtype to store the data as. Default is np.float32.
+
+    Returns:
+        torch.Tensor: The batch as a tensor on the given device.
+    """
+    tensor = torch.from_numpy(np.ascontiguousarray(data, dtype=dtype))
+    if device.type == "cuda":
+        tensor = tensor.pin_memory()
+    return tensor.to(device, non_blocking=True)
+
+
 def set_seed(seed: int) -> None:
     """
     Set the random seed for reproducibility.
@@ -109,8 +139,16 @@ def soft_update_params(net, target_net, tau):
     Returns:
         None
     """
-    for param, target_param in zip(net.parameters(), target_net.parameters()):
-        target_param.data.copy_(tau * param.data + (1 - tau) * target_param.data)
+    params = [param.data for param in net.parameters()]
+    target_params = [target_param.data for target_param in target_net.parameters()]
+
+    # Blend every parameter tensor in one fused call rather than one per parameter
+    # The _foreach ops are torch's multi-tensor kernels (as used by its optimisers) - there is no public alias
+    if target_params:
+        # pylint: disable=protected-access
+        torch._foreach_mul_(target_params, 1 - tau)
+        torch._foreach_add_(target_params, params, alpha=tau)
+        # pylint: enable=protected-access
 
     # Hard update the statistics of the target network
     for param, target_param in zip(net.buffers(), target_net.buffers()):
@@ -136,6 +174,92 @@ def hard_update_params(net, target_net):
         target_param.data.copy_(param.data)
 
 
+def compile_network(network: torch.nn.Module, mode: str = "default") -> torch.nn.Module:
+    """
+    Compiles the forward pass of a network in place with torch.compile.
+
+    Only the forward method is replaced, so the parameter names - and therefore saved and loaded state dicts - are unchanged.
+
+    Args:
+        network (torch.nn.Module): The network to compile.
+        mode (str): The torch.compile mode. Default is "default", which does not use CUDA graphs - the agents call
+            their compiled networks several times per train step and keep the outputs across calls and backward,
+            which CUDA graph replays would overwrite.
+
+    Returns:
+        torch.nn.Module: The same network with its forward compiled.
+    """
+    network.forward = torch.compile(network.forward, mode=mode)
+    return network
+
+
+def is_distributed() -> bool:
+    """Returns True when a torch.distributed process group has been initialised."""
+    return dist.is_available() and dist.is_initialized()
+
+
+def is_main_process() -> bool:
+    """Returns True for rank 0, or when not running distributed."""
+    return not is_distributed() or dist.get_rank() == 0
+
+
+def wrap_distributed(network: torch.nn.Module, device: torch.device) -> torch.nn.Module:
+    """
+    Wraps a network in DistributedDataParallel when running distributed, otherwise returns it unchanged.
+
+    Each worker trains on its own mini-batches and DDP averages the gradients during backward.
+    Buffers are not broadcast on forward as workers select actions independently of each other.
+
+    Args:
+        network (torch.nn.Module): The network to wrap - already on its device.
+        device (torch.device): The device of this worker.
+
+    Returns:
+        torch.nn.Module: The wrapped network, or the network itself when not running distributed.
+    """
+    if not is_distributed():
+        return network
+
+    device_ids = [device.index] if device.type == "cuda" else None
+    return DistributedDataParallel(
+        network, device_ids=device_ids, broadcast_buffers=False
+    )
+
+
+def unwrap_network(network: torch.nn.Module) -> torch.nn.Module:
+    """Returns the underlying network of a DistributedDataParallel wrapper."""
+    if isinstance(network, DistributedDataParallel):
+        return network.module
+    return network
+
+
+def has_mode_dependent_layers(network: torch.nn.Module) -> bool:
+    """
+    Checks whether a network contains layers that behave differently in train and eval mode.
+
+    Args:
+        network (torch.nn.Module): The network to inspect.
+
+    Returns:
+        bool: True if the network has normalisation layers with running statistics or dropout layers.
+    """
+    # The private bases cover every batch/instance norm and dropout variant, including lazy and sync ones
+    # pylint: disable=protected-access
+    return any(
+        isinstance(
+            module,
+            (
+                torch.nn.modules.batchnorm._NormBase,
+                torch.nn.modules.dropout._DropoutNd,
+                BatchRenorm,
+            ),
+        )
+        for module in network.modules()
+    )
+    # pylint: enable=protected-access
+
+
+@torch.no_grad()
 def weight_init(module: torch.nn.Module) -> None:
     """
     Custom weight init for Conv2D and Linear layers
@@ -143,16 +267,16 @@ def weight_init(module: torch.nn.Module) -> None:
     delta-orthogonal init from https://arxiv.org/pdf/1806.05393.pdf
     """
     if isinstance(module, torch.nn.Linear):
-        torch.nn.init.orthogonal_(module.weight.data)
-        module.bias.data.fill_(0.0)
+        torch.nn.init.orthogonal_(module.weight)
+        torch.nn.init.zeros_(module.bias)
 
     elif isinstance(module, (torch.nn.Conv2d, torch.nn.ConvTranspose2d)):
         assert module.weight.size(2) == module.weight.size(3)
-        module.weight.data.fill_(0.0)
-        module.bias.data.fill_(0.0)
+        torch.nn.init.zeros_(module.weight)
+        torch.nn.init.zeros_(module.bias)
         mid = module.weight.size(2) // 2
         gain = torch.nn.init.calculate_gain("relu")
-        torch.nn.init.orthogonal_(module.weight.data[:, :, mid, mid], gain)
+        torch.nn.init.orthogonal_(module.weight[:, :, mid, mid], gain)
 
 
 def normalize_observation(observation: torch.Tensor, statistics: dict) -> torch.Tensor:
@@ -279,7 +403,7 @@ def compare_models(model_1: torch.nn.Module, model_2: torch.nn.Module) -> bool:
         else:
             models_differ += 1
             if key_item_1[0] == key_item_2[0]:
-                print("Mismatch found at", key_item_1[0])
+                logging.debug("Mismatch found at %s", key_item_1[0])
             else:
                 raise ValueError(
                     f"Models are not equal. {key_item_1[0]} is not equal to {key_item_2[0]}"
@@ -287,6 +411,7 @@ def compare_models(model_1: torch.nn.Module, model_2: torch.nn.Module) -> bool:
     return models_differ == 0
 
 
+@torch.jit.script
 def prioritized_approximate_loss(
     x: torch.Tensor, min_priority: float, alpha: float
 ) -> torch.Tensor:
@@ -308,6 +433,7 @@ def prioritized_approximate_loss(
     ).mean()
 
 
+@torch.jit.script
 def huber(x: torch.Tensor, min_priority: float) -> torch.Tensor:
     """
     Computes the Huber loss function.
@@ -323,6 +449,78 @@ def huber(x: torch.Tensor, min_priority: float) -> torch.Tensor:
     return torch.where(x < min_priority, 0.5 * x.pow(2), min_priority * x).mean()
 
 
+@torch.jit.script
+def la3p_critic_loss(
+    td_error_one: torch.Tensor,
+    td_error_two: torch.Tensor,
+    min_priority: float,
+    alpha: float,
+    uniform_sampling: bool,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Computes the LA3P critic loss for twin critics and the new priorities of the sampled experiences.
+
+    Uniformly sampled batches use the prioritized approximate loss normalised by the mean priority,
+    prioritized batches use the Huber loss.
+
+    Args:
+        td_error_one (torch.Tensor): The absolute TD errors of the first critic.
+        td_error_two (torch.Tensor): The absolute TD errors of the second critic.
+        min_priority (float): The minimum priority value.
+        alpha (float): The prioritization exponent.
+        uniform_sampling (bool): Whether the batch was sampled uniformly.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: The critic loss and the (detached) priorities.
+    """
+    priorities = (
+        torch.maximum(td_error_one, td_error_two)
+        .clamp(min=min_priority)
+        .pow(alpha)
+        .detach()
+    )
+
+    if uniform_sampling:
+        critic_loss = prioritized_approximate_loss(
+            td_error_one, min_priority, alpha
+        ) + prioritized_approximate_loss(td_error_two, min_priority, alpha)
+        critic_loss = critic_loss / priorities.mean()
+    else:
+        critic_loss = huber(td_error_one, min_priority) + huber(
+            td_error_two, min_priority
+        )
+
+    return critic_loss, priorities
+
+
+@torch.jit.script
+def kl_normal(
+    mu_one: torch.Tensor,
+    std_one: torch.Tensor,
+    mu_two: torch.Tensor,
+    std_two: torch.Tensor,
+) -> torch.Tensor:
+    """
+    Computes the elementwise KL divergence KL(N(mu_one, std_one) || N(mu_two, std_two)) between two normal distributions.
+
+    Equivalent to torch.distributions.kl_divergence on two Normal distributions without building the distribution objects.
+
+    Args:
+        mu_one (torch.Tensor): The mean of the first distribution.
+        std_one (torch.Tensor): The standard deviation of the first distribution.
+        mu_two (torch.Tensor): The mean of the second distribution.
+        std_two (torch.Tensor): The standard deviation of the second distribution.
+
+    Returns:
+        torch.Tensor: The elementwise KL divergence.
+    """
+    return (
+        (std_two / std_one).log()
+        + (std_one.pow(2) + (mu_one - mu_two).pow(2)) / (2.0 * std_two.pow(2))
+        - 0.5
+    )
+
+
 def quantile_huber_loss_f(
     quantiles: torch.Tensor, samples: torch.Tensor
 ) -> torch.Tensor:
@@ -372,4 +570,4 @@ def flatten(w: int, k: int = 3, s: int = 1, p: int = 0, m: bool = True) -> int:
     r = flatten(*flatten(*flatten(w=100, k=3, s=1, p=0, m=True)))[0]
     self.fc1 = nn.Linear(r*r*128, 1024)
     """
-    return int((np.floor((w - k + 2 * p) / s) + 1) if m else 1)
+    return ((w - k + 2 * p) // s + 1) if m else 1
@@ -7,6 +7,8 @@ import inspect
 import logging
 import sys
 
+import torch
+
 import cares_reinforcement_learning.util.configurations as acf
 import cares_reinforcement_learning.util.helpers as hlp
 
@@ -570,6 +572,14 @@ def create_CTD4(observation_size, action_num, config: acf.CTD4Config):
     return agent
 
 
+# Maps each algorithm name to its create_ function - collected once at import rather than per call
+_ALGORITHM_CREATORS = {
+    name.removeprefix("create_"): obj
+    for name, obj in inspect.getmembers(sys.modules[__name__], inspect.isfunction)
+    if name.startswith("create_")
+}
+
+
 # TODO return type base "Algorithm" class?
 class NetworkFactory:
     def create_network(
@@ -580,13 +590,19 @@ class NetworkFactory:
     ):
         algorithm = config.algorithm
 
-        agent = None
-        for name, obj in inspect.getmembers(sys.modules[__name__]):
-            if inspect.isfunction(obj):
-                if name == f"create_{algorithm}":
-                    agent = obj(observation_size, action_num, config)
+        create_algorithm = _ALGORITHM_CREATORS.get(algorithm)
+        if create_algorithm is None:
+            logging.warning(f"Unkown {algorithm} algorithm.")
+            return None
+
+        # Opt-in precision trade-off - TF32 matmuls keep fp32 range with a 10-bit mantissa
+        # Note this is a process-wide torch setting, not scoped to the agent being created
+        if config.allow_tf32:
+            torch.set_float32_matmul_precision("high")
 
-        if agent is None:
-            logging.warning(f"Unkown {agent} algorithm.")
+        # Observation shapes are fixed per task, so cuDNN can autotune the conv kernels once.
+        # Opt-in as the autotuned kernel choice is not deterministic across runs, even when seeded
+        if config.cudnn_benchmark:
+            torch.backends.cudnn.benchmark = True
 
-        return agent
+        return create_algorithm(observation_size, action_num, config)
@@ -142,6 +142,10 @@ class Record:
 
         data_frame.to_csv(f"{self.current_sub_directory}/data/{filename}", index=False)
 
+        # Only build the summary string when it will actually be logged
+        if not display or not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+
         string_values = []
         for key, val in logs.items():
             if isinstance(val, list):
@@ -153,8 +157,7 @@ class Record:
         string_out = " | ".join(string_values)
         string_out = "| " + string_out + " |"
 
-        if display:
-            logging.info(string_out)
+        logging.info(string_out)
 
     def log_train(self, display: bool = False, **logs) -> None:
         self.log_count += 1
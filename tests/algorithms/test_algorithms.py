@@ -6,6 +6,9 @@ from random import randrange
 
 import numpy as np
 import pytest
+import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
 
 from cares_reinforcement_learning.memory.memory_factory import MemoryFactory
 from cares_reinforcement_learning.util import NetworkFactory, configurations
@@ -160,3 +163,82 @@ def test_algorithms(tmp_path):
             intrinsic_reward = agent.get_intrinsic_reward(
                 states[0], actions[0], next_states[0]
             )
+
+
+@pytest.mark.parametrize("algorithm", ["TD3", "SAC", "RDTD3", "LA3PTD3"])
+def test_compiled_algorithms(algorithm):
+    alg_config = getattr(configurations, f"{algorithm}Config")(use_compile=True)
+
+    observation_size = 5
+    action_num = 2
+
+    agent = NetworkFactory().create_network(
+        observation_size=observation_size, action_num=action_num, config=alg_config
+    )
+    assert agent is not None, f"{algorithm} was not created successfully"
+
+    action = agent.select_action_from_policy(np.zeros(observation_size))
+    assert action.shape == (action_num,), f"{algorithm} returned a malformed action"
+
+    memory_buffer = _policy_buffer(
+        MemoryFactory().create_memory(alg_config),
+        5,
+        observation_size,
+        action_num,
+        image_state=False,
+    )
+    info = agent.train_policy(memory_buffer, 2)
+    assert isinstance(
+        info, dict
+    ), f"{algorithm} did not return a dictionary of training info"
+
+
+@pytest.fixture
+def single_process_group(tmp_path):
+    dist.init_process_group(
+        backend="gloo",
+        init_method=f"file://{tmp_path / 'process_group'}",
+        rank=0,
+        world_size=1,
+    )
+    yield
+    dist.destroy_process_group()
+
+
+@pytest.mark.parametrize("algorithm", ["RDTD3", "LA3PTD3"])
+def test_distributed_algorithms(algorithm, single_process_group, tmp_path):
+    alg_config = getattr(configurations, f"{algorithm}Config")()
+
+    observation_size = 5
+    action_num = 2
+
+    agent = NetworkFactory().create_network(
+        observation_size=observation_size, action_num=action_num, config=alg_config
+    )
+    assert isinstance(
+        agent.actor_net, DistributedDataParallel
+    ), f"{algorithm} did not wrap its actor in DistributedDataParallel"
+    assert isinstance(
+        agent.critic_net, DistributedDataParallel
+    ), f"{algorithm} did not wrap its critic in DistributedDataParallel"
+
+    memory_buffer = _policy_buffer(
+        MemoryFactory().create_memory(alg_config),
+        5,
+        observation_size,
+        action_num,
+        image_state=False,
+    )
+    info = agent.train_policy(memory_buffer, 2)
+    assert isinstance(
+        info, dict
+    ), f"{algorithm} did not return a dictionary of training info"
+
+    agent.save_models(tmp_path, algorithm)
+    for network in ["actor", "critic"]:
+        state_dict = torch.load(tmp_path / f"{algorithm}_{network}.pht")
+        assert not any(
+            key.startswith("module.") for key in state_dict
+        ), f"{algorithm} saved the DistributedDataParallel wrapper of its {network}"
+
+    agent.load_models(tmp_path, algorithm)
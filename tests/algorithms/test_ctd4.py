@@ -0,0 +1,34 @@
+import pytest
+import torch
+
+from cares_reinforcement_learning.algorithm.policy.CTD4 import _kalman
+
+
+def _sequential_kalman(u_set, std_set):
+    # Reference pairwise fusion the ensemble is reduced with
+    fusion_u, fusion_std = u_set[0], std_set[0]
+    for mean_2, std_2 in zip(u_set[1:], std_set[1:]):
+        kalman_gain = (fusion_std**2) / (fusion_std**2 + std_2**2)
+        fusion_u = fusion_u + kalman_gain * (mean_2 - fusion_u)
+        fusion_variance = (
+            (1 - kalman_gain) * fusion_std**2 + kalman_gain * std_2**2 + 1e-6
+        )
+        fusion_std = torch.sqrt(fusion_variance)
+    return fusion_u, fusion_std
+
+
+@pytest.mark.parametrize("std_scale", [1e-3, 1.0])
+def test_kalman_matches_sequential_fusion(std_scale):
+    torch.manual_seed(0)
+    ensemble_size, batch_size = 10, 64
+
+    u_set = [torch.randn(batch_size, 1) for _ in range(ensemble_size)]
+    std_set = [
+        (torch.rand(batch_size, 1) + 0.5) * std_scale for _ in range(ensemble_size)
+    ]
+
+    fusion_u, fusion_std = _kalman(torch.stack(u_set), torch.stack(std_set))
+    expected_u, expected_std = _sequential_kalman(u_set, std_set)
+
+    assert torch.allclose(fusion_u, expected_u, rtol=1e-5, atol=1e-6)
+    assert torch.allclose(fusion_std, expected_std, rtol=1e-5, atol=1e-7)
@@ -1,4 +1,7 @@
 import timeit
+
+import numpy as np
+from cares_reinforcement_learning.memory import MemoryBuffer
 from memory import memory_buffer, memory_buffer_1e6
 
 
@@ -7,6 +10,72 @@ def test_add(memory_buffer):
     assert len(memory_buffer) == 1
 
 
+def test_add_typed_storage(memory_buffer):
+    state = np.array([1.0, 2.0, 3.0])
+    memory_buffer.add(state, [0.5, -0.5], 1.0, state, False)
+
+    states, actions, rewards, _, dones = memory_buffer.memory_buffers
+    assert states.dtype == np.float32 and states.shape == (5, 3)
+    assert actions.dtype == np.float32 and actions.shape == (5, 2)
+    assert rewards.dtype == np.float32 and rewards.shape == (5,)
+    assert dones.dtype == np.bool_
+
+
+def test_add_preallocated_fields():
+    fields = [((3,), np.float32), ((2,), np.float32), ((), np.float32)]
+    fields += [((3,), np.float32), ((), np.bool_)]
+    memory = MemoryBuffer(max_capacity=5, fields=fields)
+    assert len(memory.memory_buffers) == 5
+
+    state = np.array([1.0, 2.0, 3.0])
+    memory.add(state, [0.5, -0.5], 1.0, state, True)
+    assert len(memory.memory_buffers) == 5
+    assert np.array_equal(memory.memory_buffers[0][0], state)
+    assert memory.memory_buffers[4][0]
+
+    memory.clear()
+    assert len(memory.memory_buffers) == 5
+
+
+def test_add_memmap_storage(tmp_path):
+    memory = MemoryBuffer(max_capacity=5, location=f"{tmp_path}/replay")
+
+    state = np.array([1.0, 2.0, 3.0])
+    memory.add(state, [0.5, -0.5], 1.0, state, True)
+
+    assert isinstance(memory.memory_buffers[0], np.memmap)
+    assert (tmp_path / "replay.4").exists()
+    assert np.array_equal(memory.memory_buffers[0][0], state)
+
+    states, *_ = memory.sample_uniform(1)
+    assert np.array_equal(states[0], state)
+
+
+def test_add_memmap_shared_location(tmp_path):
+    location = f"{tmp_path}/replay"
+    memory = MemoryBuffer(max_capacity=5, location=location)
+    memory.add(np.ones(3), [0.5, -0.5], 1.0, np.ones(3), True)
+
+    # A second buffer at the same location truncates and then shares the first buffer's files
+    other_memory = MemoryBuffer(max_capacity=5, location=location)
+    other_memory.add(np.full(3, 2.0), [0.5, -0.5], 1.0, np.ones(3), True)
+    assert np.array_equal(memory.memory_buffers[0][0], np.full(3, 2.0))
+
+    # The files are left behind once the buffers are gone
+    del memory, other_memory
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"replay.{i}" for i in range(5)
+    ]
+
+
+def test_add_image_storage(memory_buffer):
+    state = {"image": np.zeros((3, 32, 32)), "vector": np.zeros(3)}
+    memory_buffer.add(state, [0.5, -0.5], 1.0, state, False)
+
+    assert memory_buffer.memory_buffers[0].dtype == object
+    assert memory_buffer.memory_buffers[0][0] is state
+
+
 def test_buffer_full(memory_buffer):
 
     for i in range(5):
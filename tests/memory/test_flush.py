@@ -1,5 +1,8 @@
+import numpy as np
 from memory import memory_buffer
 
+from cares_reinforcement_learning.memory import MemoryBuffer
+
 
 def test_flush(memory_buffer):
     for i in range(2):
@@ -38,3 +41,24 @@ def test_flush_order(memory_buffer):
     assert next_states == [0, 1, 2, 3, 4]
     assert dones == [False, False, False, False, False]
     assert log_probs == [0.0, 0.5, 1.0, 1.5, 2.0]
+
+
+def test_flush_memmap(tmp_path):
+    fields = [((3,), np.float32), ((2,), np.float32), ((), np.float32)]
+    fields += [((3,), np.float32), ((), np.bool_)]
+    memory = MemoryBuffer(max_capacity=5, fields=fields, location=f"{tmp_path}/replay")
+
+    for i in range(3):
+        memory.add(np.full(3, i + 1.0), [0.5, -0.5], 1.0, np.full(3, i), False)
+
+    states, *_ = memory.flush()
+    assert states == [[1.0, 1.0, 1.0], [2.0, 2.0, 2.0], [3.0, 3.0, 3.0]]
+
+    # clear re-opens the same files with mode "w+" - the flushed experiences are zeroed on disk
+    assert isinstance(memory.memory_buffers[0], np.memmap)
+    assert memory.memory_buffers[0].filename == str(tmp_path / "replay.0")
+    assert not np.fromfile(tmp_path / "replay.0", dtype=np.float32).any()
+
+    memory.add(np.full(3, 4.0), [0.5, -0.5], 1.0, np.full(3, 4.0), False)
+    assert len(memory) == 1
+    assert np.array_equal(memory.memory_buffers[0][0], np.full(3, 4.0))
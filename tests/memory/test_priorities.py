@@ -0,0 +1,69 @@
+import numpy as np
+from memory import memory_buffer
+
+
+def _inverse_leaves(memory_buffer):
+    return memory_buffer.inverse_tree.levels[-1][: memory_buffer.max_capacity]
+
+
+def test_inverse_tree_after_update(memory_buffer):
+    for i in range(5):
+        memory_buffer.add(i, i, i, i, False)
+
+    indices = np.array([0, 2, 4])
+    priorities = np.array([0.5, 2.0, 1e-3])
+    memory_buffer.update_priorities(indices, priorities)
+
+    expected = np.full(5, 1.0 / (1.0 + 1e-6))
+    expected[indices] = 1.0 / (priorities + 1e-6)
+
+    assert np.allclose(_inverse_leaves(memory_buffer), expected)
+    assert np.isclose(memory_buffer.inverse_tree.levels[0][0], expected.sum())
+
+
+def test_inverse_tree_after_clear(memory_buffer):
+    for i in range(5):
+        memory_buffer.add(i, i, i, i, False)
+    memory_buffer.update_priorities(np.arange(5), np.full(5, 3.0))
+
+    memory_buffer.clear()
+
+    assert np.allclose(_inverse_leaves(memory_buffer), 0.0)
+    assert memory_buffer.inverse_tree.levels[0][0] == 0.0
+
+    for i in range(3):
+        memory_buffer.add(i, i, i, i, False)
+    memory_buffer.update_priorities(np.array([1]), np.array([0.25]))
+
+    expected = np.zeros(5)
+    expected[:3] = 1.0 / (memory_buffer.min_priority + 1e-6)
+    expected[1] = 1.0 / (0.25 + 1e-6)
+
+    assert np.allclose(_inverse_leaves(memory_buffer), expected)
+    assert np.isclose(memory_buffer.inverse_tree.levels[0][0], expected.sum())
+
+
+def test_max_priority_tracks_running_max(memory_buffer):
+    assert memory_buffer.max_priority == 1.0
+
+    for i in range(3):
+        memory_buffer.add(i, i, i, i, False)
+    assert memory_buffer.max_priority == 1.0
+
+    memory_buffer.update_priorities(np.array([0, 1]), np.array([0.5, 4.0]))
+    assert memory_buffer.max_priority == 4.0
+
+    # Lowering priorities does not lower the running max
+    memory_buffer.update_priorities(np.array([1]), np.array([0.1]))
+    assert memory_buffer.max_priority == 4.0
+
+    # New experiences are added at the running max
+    memory_buffer.add(3, 3, 3, 3, False)
+    assert memory_buffer.sum_tree.levels[-1][3] == 4.0
+
+    memory_buffer.clear()
+    assert memory_buffer.max_priority == memory_buffer.min_priority
+
+    memory_buffer.add(0, 0, 0, 0, False)
+    memory_buffer.update_priorities(np.array([0]), np.array([2.0]))
+    assert memory_buffer.max_priority == 2.0
@@ -110,3 +110,21 @@ def test_save_load_vector(memory_buffer_1e6):
     loaded_memory = MemoryBuffer.load(file_path, "memory_buffer")
 
     _compare_buffer(memory_buffer_1e6, loaded_memory, len(experience))
+
+
+def test_save_load_memmap(tmp_path):
+    memory = MemoryBuffer(max_capacity=5, location=f"{tmp_path}/replay")
+
+    state = np.array([1.0, 2.0, 3.0])
+    memory.add(state, [0.5, -0.5], 1.0, state, True)
+
+    memory.save(tmp_path, "memory_buffer")
+    loaded_memory = MemoryBuffer.load(tmp_path, "memory_buffer")
+
+    _compare_buffer(memory, loaded_memory, 5)
+
+    # The loaded buffers are detached from the memmap files - writes no longer reach the disk
+    loaded_memory.add(2 * state, [0.5, -0.5], 1.0, state, True)
+    assert np.array_equal(loaded_memory.memory_buffers[0][1], 2 * state)
+    on_disk = np.fromfile(tmp_path / "replay.0", dtype=np.float32).reshape(5, 3)
+    assert not on_disk[1].any()
@@ -1,6 +1,9 @@
 import pytest
+import torch
+from torch.distributions import Normal, kl_divergence
 
 import cares_reinforcement_learning.util.helpers as hlp
+from cares_reinforcement_learning.networks.batchrenorm import BatchRenorm1d
 
 
 def test_denormalize():
@@ -17,3 +20,34 @@ def test_normalize():
     min_action_value = -5
     result = hlp.normalize(action, max_action_value, min_action_value)
     assert result == 0.5, "Result does not match expected normalized value"
+
+
+def test_flatten():
+    assert hlp.flatten(84, k=3, s=2) == 41, "Result does not match conv output size"
+    assert hlp.flatten(41, k=3, s=1) == 39, "Result does not match conv output size"
+    assert hlp.flatten(84, k=3, s=1, m=False) == 1
+    assert isinstance(hlp.flatten(100, k=5, s=3, p=1), int)
+
+
+def test_kl_normal():
+    mu_one, mu_two = torch.randn(8, 1), torch.randn(8, 1)
+    std_one, std_two = torch.rand(8, 1) + 0.1, torch.rand(8, 1) + 0.1
+    result = hlp.kl_normal(mu_one, std_one, mu_two, std_two)
+    expected = kl_divergence(Normal(mu_one, std_one), Normal(mu_two, std_two))
+    assert torch.allclose(
+        result, expected, atol=1e-6
+    ), "Result does not match torch's Normal KL divergence"
+
+
+def test_has_mode_dependent_layers():
+    mlp = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.ReLU())
+    assert not hlp.has_mode_dependent_layers(mlp), "Plain MLP has no mode layers"
+
+    dropout = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.Dropout(0.1))
+    assert hlp.has_mode_dependent_layers(dropout), "Dropout was not detected"
+
+    batch_norm = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.BatchNorm1d(4))
+    assert hlp.has_mode_dependent_layers(batch_norm), "BatchNorm was not detected"
+
+    batch_renorm = torch.nn.Sequential(torch.nn.Linear(4, 4), BatchRenorm1d(4))
+    assert hlp.has_mode_dependent_layers(batch_renorm), "BatchRenorm was not detected"